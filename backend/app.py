@@ -1,10 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from routes import generatedata, home_page, languagechange, upload_data
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from config import mongodb_config, model_config
+from routes import generatedata, home_page, languagechange, upload_data, jobs, transcribe
+from utils import model_manager, metrics, compression
+
+@asynccontextmanager
+async def lifespan(app):
+    # Models load in the background so the port is bound right away
+    model_manager.manager.start()
+    await mongodb_config.ensure_indexes()
+    await run_in_threadpool(jobs.manager.start)
+    yield
+    jobs.manager.shutdown()
+    transcribe.transcriber.close()
+    generatedata.close()
+    await mongodb_config.close()
 
 # API
-app = FastAPI()
+app = FastAPI(lifespan = lifespan)
+app.add_middleware(
+    compression.GZipRequestMiddleware,
+    max_bytes = model_config.upload_max_bytes,
+    chunk_bytes = model_config.upload_chunk_bytes
+)
+app.add_middleware(metrics.ServerTimingMiddleware)
+
+@app.exception_handler(model_manager.ModelNotReady)
+def model_not_ready(request, exc):
+    return JSONResponse(
+        {"detail" : str(exc)},
+        status_code = 503,
+        headers = {"Retry-After" : "10"}
+    )
 
 app.include_router(home_page.router)
 app.include_router(upload_data.router, prefix = "/api")
 app.include_router(generatedata.router, prefix = "/api")
-app.include_router(languagechange.router, prefix = "/api")
\ No newline at end of file
+app.include_router(languagechange.router, prefix = "/api")
+app.include_router(jobs.router, prefix = "/api")
+app.include_router(transcribe.router, prefix = "/api")
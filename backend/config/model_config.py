@@ -0,0 +1,51 @@
+import os
+from dotenv import load_dotenv
+
+# Model serving
+load_dotenv()
+
+# Inference backend per model: fp32, int8 (dynamic quantization) or onnx (ONNX Runtime)
+summary_backend = os.getenv("SUMMARY_BACKEND", "fp32")
+translate_backend = os.getenv("TRANSLATE_BACKEND", "fp32")
+onnx_dir = os.getenv("ONNX_DIR", "onnx_models")
+
+# Micro-batching in front of the summary model
+batch_max_size = int(os.getenv("BATCH_MAX_SIZE", 8))
+batch_max_wait_ms = float(os.getenv("BATCH_MAX_WAIT_MS", 25))
+
+# Preprocessing
+spacy_model = os.getenv("SPACY_MODEL", "en_core_web_sm")
+
+# Long-document (map-reduce) summarization
+long_doc_workers = int(os.getenv("LONG_DOC_WORKERS", 2))
+long_doc_torch_threads = int(os.getenv("LONG_DOC_TORCH_THREADS", 0))  # 0 = cores / workers
+long_doc_chunk_tokens = int(os.getenv("LONG_DOC_CHUNK_TOKENS", 4000))
+
+# Summary cache (in-process LRU in front of a Mongo collection)
+cache_max_entries = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", 1024))
+cache_ttl_seconds = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+# Translation
+translate_batch_size = int(os.getenv("TRANSLATE_BATCH_SIZE", 16))
+translate_cache_entries = int(os.getenv("TRANSLATE_CACHE_ENTRIES", 4096))
+
+# Background jobs
+job_workers = int(os.getenv("JOB_WORKERS", 1))
+job_torch_threads = int(os.getenv("JOB_TORCH_THREADS", 0))  # 0 = cores / workers
+job_poll_interval = float(os.getenv("JOB_POLL_INTERVAL", 0.5))
+
+# Model lifecycle: warm-up generations run after loading, before a model reports ready
+warmup_runs = int(os.getenv("MODEL_WARMUP_RUNS", 1))
+warmup_text = os.getenv("MODEL_WARMUP_TEXT", "The quick brown fox jumps over the lazy dog. It was a sunny day.")
+warmup_language = os.getenv("MODEL_WARMUP_LANGUAGE", "fra_Latn")
+
+# Streaming uploads into GridFS
+upload_max_bytes = int(os.getenv("UPLOAD_MAX_BYTES", 200 * 1024 * 1024))  # after gzip decoding
+upload_chunk_bytes = int(os.getenv("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+
+# Transcription: Whisper on a pool of worker processes, one speech segment per task
+whisper_model_size = os.getenv("WHISPER_MODEL_SIZE", "tiny")
+whisper_model = os.getenv("WHISPER_MODEL", f"openai/whisper-{whisper_model_size}")
+transcribe_workers = int(os.getenv("TRANSCRIBE_WORKERS", 2))
+transcribe_torch_threads = int(os.getenv("TRANSCRIBE_TORCH_THREADS", 0))  # 0 = cores / workers
+vad_min_silence_ms = int(os.getenv("VAD_MIN_SILENCE_MS", 500))
@@ -1,10 +1,81 @@
+import logging
 import pymongo
+from pymongo import AsyncMongoClient
+from pymongo.errors import ConnectionFailure, OperationFailure, PyMongoError
 from bson.objectid import ObjectId
 import os
 from dotenv import load_dotenv
+from config import model_config
 
 # Database
 load_dotenv()
 mongo_url = os.getenv("MONGO_URL")
-client = pymongo.MongoClient(mongo_url)
-db = client["file_db"]
\ No newline at end of file
+
+# Connection pool, timeouts and retries, shared by the sync and async clients
+client_options = {
+    "maxPoolSize" : int(os.getenv("MONGO_MAX_POOL_SIZE", 100)),
+    "minPoolSize" : int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+    "maxIdleTimeMS" : int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000)),
+    "connectTimeoutMS" : int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+    "serverSelectionTimeoutMS" : int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+    "socketTimeoutMS" : int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000)),
+    "waitQueueTimeoutMS" : int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000)),
+    "retryReads" : os.getenv("MONGO_RETRY_READS", "true").lower() == "true",
+    "retryWrites" : os.getenv("MONGO_RETRY_WRITES", "true").lower() == "true",
+}
+
+# Sync client: GridFS uploads, the summary cache and the job manager run in threads
+client = pymongo.MongoClient(mongo_url, **client_options)
+db = client["file_db"]
+
+# Async client for `async def` routes, so Mongo round trips don't hold a worker thread
+async_client = AsyncMongoClient(mongo_url, **client_options)
+async_db = async_client["file_db"]
+
+# Lookups by _id (files, summary, jobs) are covered by the default _id index
+INDEXES = {
+    "jobs" : [([("status", 1), ("created_at", 1)], {})],
+    "summary_cache" : [([("created_at", 1)], {"expireAfterSeconds" : model_config.cache_ttl_seconds})],
+    "fs.files" : [([("filename", 1), ("uploadDate", 1)], {})],
+    "fs.chunks" : [([("files_id", 1), ("n", 1)], {"unique" : True})],
+}
+
+INDEX_OPTIONS_CONFLICT = 85
+
+async def ensure_indexes():
+    """
+    Best effort, like the Mongo cache tier: a missing index only slows queries, so
+    an unreachable server or a bad index doesn't keep the API (and /health) down.
+    """
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await _ensure_index(async_db[collection], keys, options)
+            except ConnectionFailure as e:
+                # Every other index would wait out the same server selection timeout
+                logging.warning(f"Skipping index creation, MongoDB is unreachable: {e}")
+                return
+            except PyMongoError as e:
+                logging.warning(f"Could not create index {keys} on {collection}: {e}")
+
+async def _ensure_index(collection, keys, options):
+    try:
+        await collection.create_index(keys, **options)
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT:
+            raise
+        # Same keys, different options, e.g. after changing the cache TTL
+        name = "_".join(f"{key}_{direction}" for key, direction in keys)
+        if set(options) == {"expireAfterSeconds"}:
+            await collection.database.command("collMod", collection.name, index = {
+                "name" : name,
+                "expireAfterSeconds" : options["expireAfterSeconds"]
+            })
+        else:
+            await collection.drop_index(name)
+            await collection.create_index(keys, **options)
+        logging.warning(f"Index {name} on {collection.name} was rebuilt with {options}")
+
+async def close():
+    client.close()
+    await async_client.close()
@@ -1,14 +1,24 @@
 from pydantic import BaseModel, Field
-from typing import Annotated 
+from typing import Annotated, Literal
 
 # Pydantic Models
 class GenerateData(BaseModel):
     file_id : Annotated[str, Field(..., description = "mongodb _id")]
+    mode : Annotated[Literal["standard", "long"], Field("standard", description = "'long' summarizes past the 4096 token window with map-reduce")]
+
+class GenerateBatchData(BaseModel):
+    file_ids : Annotated[list[str], Field(..., min_length = 1, max_length = 1000, description = "mongodb _ids")]
+    mode : Annotated[Literal["standard", "long"], Field("standard", description = "'long' summarizes past the 4096 token window with map-reduce")]
 
 class Upload_data(BaseModel):
     file_name : Annotated[str, Field(..., description = "Name of the File")]
     file_content : Annotated[str, Field(..., description = "Data inside given file.")]  
 
+class SummarizeData(BaseModel):
+    file_name : Annotated[str, Field(..., description = "Name of the File")]
+    file_content : Annotated[str, Field(..., description = "Data inside given file.")]
+    mode : Annotated[Literal["standard", "long"], Field("standard", description = "'long' summarizes past the 4096 token window with map-reduce")]
+
 class Upload_summary(BaseModel):
     id : Annotated[str, Field(..., description = "mongodb _id")]
     file_content : Annotated[str, Field(..., description="Generated summary by model.")]
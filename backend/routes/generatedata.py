@@ -1,20 +1,287 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+import threading
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from bson.errors import InvalidId
 from bson.objectid import ObjectId
 from models import pydantic_models
-from config import mongodb_config
-from utils import preprocess, Generate_summary
+from config import mongodb_config, model_config
+from utils import preprocess, Generate_summary, batching, long_document, cache, sse, model_manager, metrics, file_store
+from routes.upload_data import store_upload
 
 router = APIRouter()
-summary = Generate_summary.Generate_summary()
 
-@router.post('/Generatetext')
-def Generate_text(data : pydantic_models.GenerateData):
+def _warmup_summary(model):
+    for _ in range(model_config.warmup_runs):
+        model.summury_generated(model_config.warmup_text)
+
+# Loaded in the background by the model manager; routes answer 503 until it is ready
+summary_model = model_manager.manager.register("summary", Generate_summary.Generate_summary, _warmup_summary)
+batcher = batching.MicroBatcher(
+    lambda texts: summary_model.get().summury_generated_batch(texts),
+    max_batch_size = model_config.batch_max_size,
+    max_wait_ms = model_config.batch_max_wait_ms,
+    name = "summary"
+)
+metrics.gauge("summarizer_queue_depth", "Summaries waiting for a batch", batcher.queue_depth)
+long_summary = None
+_long_summary_lock = threading.Lock()
+
+def get_long_summary():
+    global long_summary
+    with _long_summary_lock:
+        if long_summary is None:
+            long_summary = long_document.LongDocumentSummarizer(
+                summary_model.get().tokenizer,
+                batcher,
+                max_workers = model_config.long_doc_workers,
+                torch_threads = model_config.long_doc_torch_threads,
+                chunk_tokens = model_config.long_doc_chunk_tokens
+            )
+    return long_summary
+
+def close():
+    if long_summary is not None:
+        long_summary.close()
+
+summary_cache = cache.SummaryCache(
+    mongodb_config.db.summary_cache,
+    max_entries = model_config.cache_max_entries,
+    ttl_seconds = model_config.cache_ttl_seconds
+)
+
+def _prepare(summary, content, mode, generation_kwargs):
+    with metrics.stage("preprocess"):
+        if mode == "long":
+            sentences = preprocess.get_engine().sentences(content)
+            txt = " ".join(sentences)
+        else:
+            sentences = None
+            txt = preprocess.preprocess_text(content)
+
+    return txt, sentences, _cache_key(summary, txt, mode, generation_kwargs)
+
+def _cache_key(summary, txt, mode, generation_kwargs):
+    params = {
+        "mode" : mode,
+        "backend" : summary.backend,
+        "max_input_length" : summary.max_input_length,
+        **generation_kwargs
+    }
+    if mode == "long":
+        # The map-reduce chunk budget changes the summary too (workers / threads don't)
+        params["chunk_tokens"] = model_config.long_doc_chunk_tokens
+    return summary_cache.key(txt, summary.model_name, params)
+
+async def summarize(content, mode = "standard"):
+    summary = summary_model.get()
+    # CPU-bound and sync-Mongo steps go to the threadpool; the batch itself is awaited
+    txt, sentences, key = await run_in_threadpool(_prepare, summary, content, mode, summary.generation_kwargs)
+    with metrics.stage("cache_lookup"):
+        ans = await run_in_threadpool(summary_cache.get, key)
+    if ans is None:
+        with metrics.stage("summarize"):
+            if mode == "long":
+                ans = await run_in_threadpool(lambda: get_long_summary().summarize(sentences))
+            else:
+                ans = await asyncio.wrap_future(batcher.submit(txt))
+        await run_in_threadpool(summary_cache.set, key, ans, summary.model_name)
+    return ans
 
-    doc = mongodb_config.db.files.find_one({"_id": ObjectId(data.file_id)})
+async def summary_events(content, mode = "standard", on_done = None):
+    """
+    SSE stream of summary fragments ending in a `done` event. `await on_done(summary)`
+    runs before `done` is sent and may return extra fields for its payload.
+    """
+    summary = summary_model.get()
+    txt, sentences, key = await run_in_threadpool(_prepare, summary, content, mode, summary.stream_generation_kwargs)
+    with metrics.stage("cache_lookup"):
+        ans = await run_in_threadpool(summary_cache.get, key)
+
+    async def events():
+        nonlocal ans
+        if ans is None:
+            # Long documents are map-reduced first; only the final pass is streamed
+            chunk = await run_in_threadpool(lambda: get_long_summary().reduce(sentences)) if mode == "long" else txt
+            fragments = []
+            async for fragment in iterate_in_threadpool(summary.summury_stream(chunk)):
+                fragments.append(fragment)
+                yield sse.format_event({"text" : fragment})
+            ans = "".join(fragments).strip()
+            await run_in_threadpool(summary_cache.set, key, ans, summary.model_name)
+        else:
+            yield sse.format_event({"text" : ans})
+        extra = await on_done(ans) if on_done is not None else None
+        yield sse.format_event({"summary" : ans, **(extra or {})}, "done")
+
+    return events()
+
+# Only what the routes read; the rest of the document stays on the server
+_FILE_FIELDS = {"file_content" : 1, "gridfs_id" : 1}
+
+async def _find_file(file_id):
+    with metrics.stage("mongo_find"):
+        return await mongodb_config.async_db.files.find_one({"_id": ObjectId(file_id)}, _FILE_FIELDS)
+
+async def _load_content(doc):
+    # Streamed uploads keep their content in GridFS; older documents inline it
+    with metrics.stage("gridfs_read"):
+        return await file_store.load_text_async(mongodb_config.async_db, doc)
+
+async def _insert_file(data):
+    # Stored in GridFS like streamed uploads, so a document isn't capped by the 16MB BSON limit
+    try:
+        with metrics.stage("gridfs_write"):
+            return await run_in_threadpool(
+                file_store.store_text, mongodb_config.db, data.file_name, data.file_content, model_config.upload_max_bytes)
+    except file_store.UploadTooLarge as e:
+        raise HTTPException(status_code = 413, detail = str(e))
+
+async def _save_summary(file_id, ans):
+    # Same layout as /upload_summury: the summary shares its document's _id
+    with metrics.stage("mongo_insert"):
+        await mongodb_config.async_db.summary.update_one(
+            {"_id" : file_id},
+            {"$set" : {"file_content" : ans}},
+            upsert = True
+        )
+    return {"file_id" : str(file_id), "summary_id" : str(file_id)}
+
+@router.post('/Generatetext')
+async def Generate_text(data : pydantic_models.GenerateData):
+    doc = await _find_file(data.file_id)
     if not doc:
         return HTTPException(status_code = 404, detail = "file not found")
-    
-    txt = doc["file_content"]
-    txt = preprocess.preprocess_text(txt)
-    ans = summary.summury_generated(txt)
-    return {"summary" : ans}
\ No newline at end of file
+    return {"summary" : await summarize(await _load_content(doc), data.mode)}
+
+@router.post('/Generatetext/stream')
+async def Generate_text_stream(data : pydantic_models.GenerateData):
+    doc = await _find_file(data.file_id)
+    if not doc:
+        raise HTTPException(status_code = 404, detail = "file not found")
+    events = await summary_events(await _load_content(doc), data.mode)
+    return StreamingResponse(events, media_type = "text/event-stream")
+
+@router.post('/summarize')
+async def summarize_document(data : pydantic_models.SummarizeData):
+    """Store the document, summarize it and store the summary in one call"""
+    summary_model.get()  # 503 before anything is written
+    file_id = await _insert_file(data)
+    ans = await summarize(data.file_content, data.mode)
+    return {**await _save_summary(file_id, ans), "summary" : ans}
+
+@router.post('/summarize/stream')
+async def summarize_document_stream(data : pydantic_models.SummarizeData):
+    summary_model.get()
+    file_id = await _insert_file(data)
+    events = await summary_events(data.file_content, data.mode, on_done = lambda ans: _save_summary(file_id, ans))
+    return StreamingResponse(events, media_type = "text/event-stream")
+
+async def _receive_document(request, file_name):
+    # Body goes straight to GridFS; only the stored text is read back for the model
+    summary_model.get()
+    file_id, upload = await store_upload(request, file_name)
+    return file_id, await _load_content({"gridfs_id" : upload.sink.gridfs_id})
+
+@router.post('/summarize/upload')
+async def summarize_upload(request : Request, file_name : str = "upload", mode : Literal["standard", "long"] = "standard"):
+    """
+    /summarize for a streamed body: multipart/form-data (`file` part) or raw,
+    optionally Content-Encoding: gzip, written to GridFS as it arrives.
+    """
+    file_id, content = await _receive_document(request, file_name)
+    ans = await summarize(content, mode)
+    return {**await _save_summary(file_id, ans), "summary" : ans}
+
+@router.post('/summarize/upload/stream')
+async def summarize_upload_stream(request : Request, file_name : str = "upload", mode : Literal["standard", "long"] = "standard"):
+    file_id, content = await _receive_document(request, file_name)
+    events = await summary_events(content, mode, on_done = lambda ans: _save_summary(file_id, ans))
+    return StreamingResponse(events, media_type = "text/event-stream")
+
+async def batch_results(file_ids, mode = "standard"):
+    """
+    Yields one result dict per file_id as it completes: {"file_id", "summary"}
+    or {"file_id", "error"}. Documents come from one $in query, are preprocessed
+    together and reach the micro-batcher sorted by length, so each model batch
+    pads to similar lengths.
+    """
+    summary = summary_model.get()
+    ids = {}
+    for file_id in dict.fromkeys(file_ids):
+        try:
+            ids[ObjectId(file_id)] = file_id
+        except (InvalidId, TypeError):
+            yield {"file_id" : file_id, "error" : "invalid file_id"}
+
+    with metrics.stage("mongo_find"):
+        cursor = mongodb_config.async_db.files.find({"_id" : {"$in" : list(ids)}}, _FILE_FIELDS)
+        docs = {doc["_id"] : doc async for doc in cursor}
+    found = []
+    for oid, file_id in ids.items():
+        if oid in docs:
+            found.append((file_id, docs[oid]))
+        else:
+            yield {"file_id" : file_id, "error" : "file not found"}
+
+    contents = []
+    for file_id, doc in found:
+        try:
+            contents.append((file_id, await _load_content(doc)))
+        except Exception as e:
+            yield {"file_id" : file_id, "error" : f"could not read file: {e}"}
+
+    if mode == "long":
+        # Each long document is already map-reduced in parallel chunks
+        for file_id, content in contents:
+            try:
+                yield {"file_id" : file_id, "summary" : await summarize(content, mode)}
+            except Exception as e:
+                yield {"file_id" : file_id, "error" : str(e)}
+        return
+
+    with metrics.stage("preprocess"):
+        texts = await run_in_threadpool(preprocess.preprocess_many, [content for _, content in contents])
+    keys = [_cache_key(summary, txt, mode, summary.generation_kwargs) for txt in texts]
+    with metrics.stage("cache_lookup"):
+        cached = await run_in_threadpool(lambda: [summary_cache.get(key) for key in keys])
+
+    pending = {}
+    for i in sorted(range(len(texts)), key = lambda i: len(texts[i])):
+        file_id = contents[i][0]
+        if cached[i] is not None:
+            yield {"file_id" : file_id, "summary" : cached[i]}
+        else:
+            pending[asyncio.wrap_future(batcher.submit(texts[i]))] = (file_id, keys[i])
+
+    with metrics.stage("summarize"):
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+            for future in done:
+                file_id, key = pending.pop(future)
+                if future.exception() is not None:
+                    yield {"file_id" : file_id, "error" : str(future.exception())}
+                    continue
+                await run_in_threadpool(summary_cache.set, key, future.result(), summary.model_name)
+                yield {"file_id" : file_id, "summary" : future.result()}
+
+@router.post('/Generatetext/batch')
+async def Generate_text_batch(data : pydantic_models.GenerateBatchData):
+    """Newline-delimited JSON, one line per file in completion order"""
+    summary_model.get()
+
+    async def lines():
+        async for result in batch_results(data.file_ids, data.mode):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type = "application/x-ndjson")
+
+@router.get('/Generatetext/stats')
+def Generate_stats():
+    return {
+        "batching" : batcher.stats(),
+        "cache" : summary_cache.stats()
+    }
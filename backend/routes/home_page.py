@@ -1,9 +1,16 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from utils import model_manager, metrics
 
 router = APIRouter()
 MODEL_VERSION = '1.0.0'
 
+metrics.gauge("summarizer_process_memory_bytes", "Resident memory of the API process", model_manager.process_memory_bytes)
+metrics.gauge(
+    "summarizer_model_memory_bytes", "Weight memory per loaded model",
+    lambda: [({"model" : name}, status["memory_bytes"]) for name, status in model_manager.manager.status().items()]
+)
+
 @router.get('/')
 def home_page():
     return JSONResponse(
@@ -14,6 +21,20 @@ def home_page():
 @router.get('/health')
 def health():
     return {
-        "Status" : 'OK',
-        "Model_version" : MODEL_VERSION
-    }
\ No newline at end of file
+        "Status" : {"ready" : 'OK', "failed" : 'FAILED'}.get(model_manager.manager.state(), 'LOADING'),
+        "Model_version" : MODEL_VERSION,
+        "Ready" : model_manager.manager.ready(),
+        "Models" : model_manager.manager.status(),
+        "Process_memory_bytes" : model_manager.process_memory_bytes()
+    }
+
+@router.get('/ready')
+def ready():
+    # Readiness probe: only route traffic here once every model is warmed up
+    if not model_manager.manager.ready():
+        return JSONResponse({"Ready" : False, "Models" : model_manager.manager.status()}, status_code=503)
+    return {"Ready" : True}
+
+@router.get('/metrics')
+def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type = "text/plain; version=0.0.4")
@@ -0,0 +1,69 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from models import pydantic_models
+from config import mongodb_config, model_config
+from utils import job_queue, sse, metrics
+
+router = APIRouter()
+manager = job_queue.JobManager(
+    mongodb_config.db,
+    max_workers = model_config.job_workers,
+    torch_threads = model_config.job_torch_threads,
+    chunk_tokens = model_config.long_doc_chunk_tokens
+)
+
+async def _submit(kind, payload):
+    job = job_queue.new_job(kind, payload)
+    with metrics.stage("mongo_insert"):
+        job["_id"] = (await mongodb_config.async_db.jobs.insert_one(job)).inserted_id
+    # Loading the text and handing it to the pool stays sync; the JobManager shares it
+    # with startup recovery and the pool's done-callbacks
+    await run_in_threadpool(manager.dispatch, job)
+    return str(job["_id"])
+
+async def _get_job(job_id):
+    try:
+        job_id = ObjectId(job_id)
+    except InvalidId:
+        return None
+    with metrics.stage("mongo_find"):
+        return job_queue.job_view(await mongodb_config.async_db.jobs.find_one({"_id" : job_id}, {"payload" : 0}))
+
+@router.post('/jobs/summarize')
+async def summarize_job(data : pydantic_models.GenerateData):
+    return {"job_id" : await _submit("summarize", {"file_id" : data.file_id, "mode" : data.mode})}
+
+@router.post('/jobs/translate')
+async def translate_job(data : pydantic_models.languageData):
+    return {"job_id" : await _submit("translate", {"id" : data.id, "language" : data.language})}
+
+@router.get('/jobs/{job_id}')
+async def job_status(job_id : str):
+    job = await _get_job(job_id)
+    if not job:
+        raise HTTPException(status_code = 404, detail = "job not found")
+    return job
+
+@router.get('/jobs/{job_id}/events')
+async def job_events(job_id : str):
+    job = await _get_job(job_id)
+    if not job:
+        raise HTTPException(status_code = 404, detail = "job not found")
+
+    async def events(job):
+        # Server-sent events: one message per status change, closed once the job finishes
+        last_status = None
+        while True:
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield sse.format_event(job, last_status)
+            if last_status in job_queue.FINISHED_STATES:
+                return
+            await asyncio.sleep(model_config.job_poll_interval)
+            job = await _get_job(job_id)
+
+    return StreamingResponse(events(job), media_type = "text/event-stream")
@@ -1,21 +1,56 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from models import pydantic_models
-from utils import Generate_summary
-from config import mongodb_config
+from utils import Generate_summary, sse, model_manager, metrics
+from config import mongodb_config, model_config
 from bson.objectid import ObjectId
 
 router = APIRouter()
-changelang = Generate_summary.changelang()
+
+def _load_changelang():
+    return Generate_summary.changelang(
+        batch_size = model_config.translate_batch_size,
+        cache_entries = model_config.translate_cache_entries
+    )
+
+def _warmup_changelang(model):
+    for _ in range(model_config.warmup_runs):
+        model.translate_sentences([model_config.warmup_text], model_config.warmup_language)
+
+changelang_model = model_manager.manager.register("translate", _load_changelang, _warmup_changelang)
 
 @router.post('/changelanguage')
-def change(data : pydantic_models.languageData):
-    doc = mongodb_config.db.summary.find_one({
-        "_id" : ObjectId(data.id)
-    })
+async def change(data : pydantic_models.languageData):
+    changelang = changelang_model.get()
+    with metrics.stage("mongo_find"):
+        doc = await mongodb_config.async_db.summary.find_one({
+            "_id" : ObjectId(data.id)
+        }, {"file_content" : 1})
     if not doc:
         raise HTTPException(status_code = 404, detail = "file not found.")
     
     text = doc["file_content"]
-    ans = changelang.change_language(text, data.language)
+    with metrics.stage("translate"):
+        ans = await run_in_threadpool(changelang.change_language, text, data.language)
+
+    return {"summary" : ans}
+
+@router.post('/changelanguage/stream')
+async def change_stream(data : pydantic_models.languageData):
+    changelang = changelang_model.get()
+    with metrics.stage("mongo_find"):
+        doc = await mongodb_config.async_db.summary.find_one({
+            "_id" : ObjectId(data.id)
+        }, {"file_content" : 1})
+    if not doc:
+        raise HTTPException(status_code = 404, detail = "file not found.")
+
+    def events():
+        sentences = []
+        for sentence in changelang.change_language_stream(doc["file_content"], data.language):
+            sentences.append(sentence)
+            yield sse.format_event({"text" : sentence + " "})
+        yield sse.format_event({"summary" : " ".join(sentences)}, "done")
 
-    return {"summary" : ans}
\ No newline at end of file
+    return StreamingResponse(events(), media_type = "text/event-stream")
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import queue
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+from config import model_config
+from utils import transcribe, sse, metrics
+
+router = APIRouter()
+transcriber = transcribe.Transcriber(
+    model_config.whisper_model,
+    max_workers = model_config.transcribe_workers,
+    torch_threads = model_config.transcribe_torch_threads,
+    min_silence_ms = model_config.vad_min_silence_ms
+)
+
+class _AudioUpload():
+    """
+    Decodes and transcribes the request body while it is still arriving. The
+    compressed bytes pass through a small bounded queue into ffmpeg, so neither
+    the upload nor the decoded PCM is ever held in memory as a whole.
+    """
+
+    def __init__(self, request, max_bytes = model_config.upload_max_bytes, max_chunks = 16):
+        self.request = request
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.samples = 0
+        self.sha256 = hashlib.sha256()
+        self._body = queue.Queue(maxsize = max_chunks)
+        self._results = asyncio.Queue()
+        self._closed = False
+        self._tasks = []
+
+    async def start(self):
+        """Returns once the whole body is received; transcription is already under way by then"""
+        if int(self.request.headers.get("content-length", 0)) > self.max_bytes:
+            raise HTTPException(status_code = 413, detail = f"upload is larger than {self.max_bytes} bytes")
+        self._tasks = [asyncio.create_task(self._transcribe()), asyncio.create_task(self._receive())]
+        # The body has to be read before a streaming response starts: Starlette
+        # listens for the disconnect on the same receive channel
+        too_large = await self._tasks[1]
+        if too_large:
+            self.close()
+            raise HTTPException(status_code = 413, detail = f"upload is larger than {self.max_bytes} bytes")
+
+    async def _receive(self):
+        too_large = False
+        async for chunk in self.request.stream():
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                too_large = True
+                break
+            self.sha256.update(chunk)
+            if chunk:
+                await self._put(chunk)
+        await self._put(None)
+        return too_large
+
+    async def _put(self, item):
+        # Never block the event loop, and give up once decoding has stopped
+        while not self._closed:
+            try:
+                return self._body.put_nowait(item)
+            except queue.Full:
+                await asyncio.sleep(0.005)
+
+    def _blocks(self):
+        for block in transcribe.decode_stream(iter(self._body.get, None)):
+            self.samples += len(block)
+            yield block
+
+    async def _transcribe(self):
+        try:
+            with metrics.stage("transcribe"):
+                async for segment in iterate_in_threadpool(transcriber.transcribe_stream(self._blocks())):
+                    await self._results.put(segment)
+        except transcribe.AudioError as e:
+            await self._results.put(HTTPException(status_code = 415, detail = str(e)))
+        except Exception as e:
+            await self._results.put(e)
+        finally:
+            self._release()
+            await self._results.put(None)
+
+    async def segments(self):
+        try:
+            while (item := await self._results.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.close()
+
+    @property
+    def duration(self):
+        return round(self.samples / transcribe.SAMPLE_RATE, 2)
+
+    def _release(self):
+        # Unblock the ffmpeg feeder, which may be waiting on the next chunk
+        self._closed = True
+        while True:
+            try:
+                self._body.get_nowait()
+            except queue.Empty:
+                break
+        self._body.put_nowait(None)
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._release()
+
+@router.post('/transcribe')
+async def transcribe_audio(request : Request):
+    """Raw audio body (wav, mp3, m4a, ...) -> transcript with per-segment timestamps"""
+    upload = _AudioUpload(request)
+    await upload.start()
+    segments = [segment async for segment in upload.segments()]
+    return {
+        "text" : " ".join(segment["text"] for segment in segments if segment["text"]),
+        "segments" : segments,
+        "duration" : upload.duration,
+        "sha256" : upload.sha256.hexdigest()
+    }
+
+@router.post('/transcribe/stream')
+async def transcribe_audio_stream(request : Request):
+    upload = _AudioUpload(request)
+    await upload.start()
+
+    async def events():
+        texts = []
+        try:
+            async for segment in upload.segments():
+                if segment["text"]:
+                    texts.append(segment["text"])
+                yield sse.format_event({**segment, "text" : segment["text"] + " "})
+        except HTTPException as e:
+            # Headers are already sent; report it in-band
+            yield sse.format_event({"status_code" : e.status_code, "detail" : e.detail}, "error")
+            return
+        yield sse.format_event({
+            "text" : " ".join(texts),
+            "duration" : upload.duration,
+            "sha256" : upload.sha256.hexdigest()
+        }, "done")
+
+    return StreamingResponse(events(), media_type = "text/event-stream")
@@ -1,23 +1,83 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 from models import pydantic_models
-from config import mongodb_config
+from config import mongodb_config, model_config
+from utils import metrics, file_store
 from bson.objectid import ObjectId
 
 
 router = APIRouter()
 
 @router.post('/upload')
-def upload_file(data: pydantic_models.Upload_data):
-    file_id = mongodb_config.db.files.insert_one({
-        "file_name" : data.file_name,
-        "file_content" : data.file_content
-    }).inserted_id
-    return {"file_id" : str(file_id)}
+async def upload_file(data: pydantic_models.Upload_data):
+    with metrics.stage("mongo_insert"):
+        result = await mongodb_config.async_db.files.insert_one({
+            "file_name" : data.file_name,
+            "file_content" : data.file_content
+        })
+    return {"file_id" : str(result.inserted_id)}
+
+async def store_upload(request, file_name):
+    """
+    Streams the request body into GridFS through file_store.StreamingUpload and
+    returns (file_id, upload). Upload errors become 4xx responses.
+    """
+    try:
+        upload = file_store.StreamingUpload(
+            mongodb_config.db,
+            request.headers.get("content-type"),
+            request.headers.get("content-encoding"),
+            file_name = file_name,
+            max_bytes = model_config.upload_max_bytes
+        )
+    except file_store.UploadError as e:
+        raise HTTPException(status_code = 415, detail = str(e))
+
+    try:
+        with metrics.stage("gridfs_write"):
+            # Hand the blocking parse + GridFS writes to a thread in ~upload_chunk_bytes pieces
+            buffer = bytearray()
+            async for chunk in request.stream():
+                buffer += chunk
+                if len(buffer) >= model_config.upload_chunk_bytes:
+                    await run_in_threadpool(upload.feed, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await run_in_threadpool(upload.feed, bytes(buffer))
+            file_id = await run_in_threadpool(upload.close)
+    except file_store.UploadError as e:
+        await run_in_threadpool(upload.abort)
+        if isinstance(e, file_store.UploadTooLarge):
+            status = 413
+        elif isinstance(e, file_store.UnsupportedUpload):
+            status = 415
+        else:
+            status = 400
+        raise HTTPException(status_code = status, detail = str(e))
+    except BaseException:
+        # Client went away mid-upload; don't leave orphaned chunks behind
+        await run_in_threadpool(upload.abort)
+        raise
+    return file_id, upload
+
+@router.post('/upload/stream')
+async def upload_stream(request : Request, file_name : str = "upload"):
+    """
+    Streams a multipart/form-data (`file` part) or raw body, optionally sent with
+    Content-Encoding: gzip, into GridFS. Only a reference is stored in `files`.
+    """
+    file_id, upload = await store_upload(request, file_name)
+    return {
+        "file_id" : str(file_id),
+        "sha256" : upload.sink.sha256.hexdigest(),
+        "length" : upload.sink.length
+    }
 
 @router.post('/upload_summury')
-def upload_summury(data : pydantic_models.Upload_summary):
-    file_id = mongodb_config.db.summary.insert_one({
-        "_id" : ObjectId(data.id),
-        "file_content" : data.file_content
-    }).inserted_id
-    return {"file_id" : str(file_id)}
\ No newline at end of file
+async def upload_summury(data : pydantic_models.Upload_summary):
+    with metrics.stage("mongo_insert"):
+        result = await mongodb_config.async_db.summary.insert_one({
+            "_id" : ObjectId(data.id),
+            "file_content" : data.file_content
+        })
+    return {"file_id" : str(result.inserted_id)}
\ No newline at end of file
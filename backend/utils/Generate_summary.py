@@ -1,38 +1,152 @@
+import re
+import threading
+import time
 import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+from transformers import TextIteratorStreamer
+from config import model_config
+from utils import cache, inference_backend, metrics
+
+# Sentence boundary for translation batches: end punctuation followed by whitespace
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
 
 class Generate_summary():
-    def __init__(self):
+    def __init__(self, backend = model_config.summary_backend):
         model = "google/long-t5-tglobal-base"
+        self.model_name = model
+        self.backend = backend
+        self.max_input_length = 4096
+        self.generation_kwargs = {"max_length" : 256, "num_beams" : 4, "early_stopping" : True}
+        # Streaming needs a single hypothesis, so it decodes greedily
+        self.stream_generation_kwargs = {"max_length" : 256, "num_beams" : 1, "do_sample" : False}
         self.device = torch.device("cpu")
-        self.tokenizer = AutoTokenizer.from_pretrained(model)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(model).to(self.device)
+        self.tokenizer, self.model = inference_backend.load_seq2seq(model, backend, self.device, model_config.onnx_dir)
 
     def summury_generated(self, text):
+        return self.summury_generated_batch([text])[0]
+
+    def summury_generated_batch(self, texts):
+        # Pads every text to the longest in the batch so they share one generate call
+        texts = ["summarize: " + text for text in texts]
+        with metrics.stage("tokenize"):
+            inputs = self.tokenizer(texts, return_tensors="pt", max_length=self.max_input_length, truncation=True, padding=True).to(self.device)
+        started = time.perf_counter()
+        with metrics.stage("generate"):
+            summary_ids = self.model.generate(**inputs, **self.generation_kwargs)
+        _record_generation(self.model_name, inputs, summary_ids, self.tokenizer.pad_token_id, time.perf_counter() - started)
+        with metrics.stage("decode"):
+            summaries = self.tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
+        return summaries
+
+    def summury_stream(self, text):
+        """Yields text fragments of a greedy summary while it is being generated"""
         text = "summarize: " + text
-        inputs = self.tokenizer(text, return_tensors="pt", max_length=4096, truncation=True).to(self.device)
-        summary_ids = self.model.generate(inputs["input_ids"], max_length=256, num_beams=4, early_stopping=True)
-        summary = self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-        return summary
+        inputs = self.tokenizer(text, return_tensors="pt", max_length=self.max_input_length, truncation=True).to(self.device)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        yield from _stream_generate(self.model, dict(**inputs, **self.stream_generation_kwargs), streamer)
     
 class changelang():
-    def __init__(self):
+    def __init__(self, batch_size = 16, cache_entries = 4096, backend = model_config.translate_backend):
         lang_model = "facebook/nllb-200-distilled-600M"  # or your specific model
+        self.lang_model_name = lang_model
+        self.backend = backend
         self.device = torch.device("cpu")
-        self.lang_tokenizer = AutoTokenizer.from_pretrained(lang_model)
-        self.lang_model = AutoModelForSeq2SeqLM.from_pretrained(lang_model).to(self.device)
+        self.lang_tokenizer, self.lang_model = inference_backend.load_seq2seq(lang_model, backend, self.device, model_config.onnx_dir)
+        self.batch_size = batch_size
+        # (sentence, target_language, model, backend) -> translated sentence
+        self.sentence_cache = cache.LRUCache(cache_entries)
 
     def change_language(self, text, language):
-        inputs = self.lang_tokenizer(text, return_tensors="pt")
-        target_lang = language
-        forced_bos_token_id=self.lang_tokenizer.convert_tokens_to_ids(target_lang)
-        translated = self.lang_model.generate(
-        **inputs,
-        forced_bos_token_id=forced_bos_token_id,
-        max_length = 512,
-        num_beams = 4,
-        early_stopping = True,
-        do_sample = False
-        )
-        translated_text = self.lang_tokenizer.decode(translated[0], skip_special_tokens=True)
-        return translated_text
\ No newline at end of file
+        return " ".join(self.translate_cached(split_sentences(text), language))
+
+    def change_language_stream(self, text, language):
+        """Yields translated sentences in order; the first one alone so it shows up quickly"""
+        sentences = split_sentences(text)
+        start = 0
+        size = 1
+        while start < len(sentences):
+            for translated_text in self.translate_cached(sentences[start:start + size], language):
+                yield translated_text
+            start += size
+            size = self.batch_size
+
+    def translate_cached(self, sentences, language):
+        translated = {}
+        missing = []
+        for sentence in dict.fromkeys(sentences):
+            hit = self.sentence_cache.get((sentence, language, self.lang_model_name, self.backend))
+            if hit is None:
+                missing.append(sentence)
+            else:
+                translated[sentence] = hit
+
+        # Only sentences not seen before for this language go through the model
+        for sentence, result in zip(missing, self.translate_sentences(missing, language)):
+            self.sentence_cache.set((sentence, language, self.lang_model_name, self.backend), result)
+            translated[sentence] = result
+
+        return [translated[sentence] for sentence in sentences]
+
+    def translate_sentences(self, sentences, language):
+        if not sentences:
+            return []
+        forced_bos_token_id = self.lang_tokenizer.convert_tokens_to_ids(language)
+        # Similar lengths share a batch so little time goes into padding
+        order = sorted(range(len(sentences)), key = lambda i: len(sentences[i]))
+        results = [None] * len(sentences)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            with metrics.stage("translate_tokenize"):
+                inputs = self.lang_tokenizer(
+                    [sentences[i] for i in batch],
+                    return_tensors = "pt",
+                    padding = True,
+                    truncation = True,
+                    max_length = 512
+                ).to(self.device)
+            started = time.perf_counter()
+            with metrics.stage("translate_generate"):
+                translated = self.lang_model.generate(
+                **inputs,
+                forced_bos_token_id=forced_bos_token_id,
+                max_length = 512,
+                num_beams = 4,
+                early_stopping = True,
+                do_sample = False
+                )
+            _record_generation(self.lang_model_name, inputs, translated, self.lang_tokenizer.pad_token_id, time.perf_counter() - started)
+            with metrics.stage("translate_decode"):
+                decoded = self.lang_tokenizer.batch_decode(translated, skip_special_tokens=True)
+            for i, translated_text in zip(batch, decoded):
+                results[i] = translated_text
+        return results
+
+def split_sentences(text):
+    return [s for s in _SENTENCE_END_RE.split(text.strip()) if s]
+
+def _record_generation(model_name, inputs, output_ids, pad_token_id, seconds):
+    metrics.record_generation(
+        model_name,
+        inputs["attention_mask"].sum(dim=1).tolist(),
+        (output_ids != pad_token_id).sum(dim=1).tolist(),
+        seconds
+    )
+
+def _stream_generate(model, generate_kwargs, streamer):
+    # generate() runs on its own thread and feeds the streamer we iterate here
+    errors = []
+
+    def run():
+        try:
+            model.generate(**generate_kwargs, streamer=streamer)
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    for fragment in streamer:
+        if fragment:
+            yield fragment
+    thread.join()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, InvalidStateError
+from queue import Queue, Empty
+from utils import metrics
+
+class MicroBatcher():
+    """
+    Holds incoming requests for a short window and runs them through
+    `batch_fn` as one batch. Every caller gets back a Future for its own item.
+    """
+
+    def __init__(self, batch_fn, max_batch_size = 8, max_wait_ms = 25, name = "micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._queue = Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._queue_waits = deque(maxlen = 1024)
+        self._run_times = deque(maxlen = 1024)
+        self._requests = 0
+        self._batches = 0
+        self._failed_batches = 0
+        self._thread = threading.Thread(target = self._run, name = name, daemon = True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        # The batch runs on another thread; its stage timings go back to the caller's request
+        self._queue.put((item, future, time.perf_counter(), metrics.request_timings()))
+        return future
+
+    def __call__(self, item, timeout = None):
+        return self.submit(item).result(timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _collect(self):
+        # Block for the first request, then wait at most `max_wait` for company
+        batch = []
+        while not batch:
+            self._take(self._queue.get(), batch)
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    entry = self._queue.get(timeout = remaining)
+                else:
+                    # Window is over, but take whatever is already waiting
+                    entry = self._queue.get_nowait()
+            except Empty:
+                break
+            self._take(entry, batch)
+        return batch
+
+    def _take(self, entry, batch):
+        # Marks the future running, so it can no longer be cancelled (asyncio.wrap_future
+        # cancels it with the awaiting task); callers that already gave up are dropped
+        if entry[1].set_running_or_notify_cancel():
+            batch.append(entry)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                for _, future, _, _ in batch:
+                    _resolve(future, error = e)
+            # The only worker thread must outlive any batch, and no caller may be left waiting
+            for _, future, _, _ in batch:
+                _resolve(future, error = RuntimeError(f"{self.name}: batch returned no result for this item"))
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        items = [entry[0] for entry in batch]
+        failed = False
+        with metrics.collect_timings() as stages:
+            try:
+                outcomes = [(result, None) for result in self.batch_fn(items)]
+            except Exception as e:
+                failed = True
+                outcomes = [(None, e)] if len(batch) == 1 else self._run_singly(items)
+        # Recorded before the callers wake up and send their Server-Timing header
+        self._record(batch, started, time.perf_counter(), failed, stages)
+        for (_, future, _, _), (result, error) in zip(batch, outcomes):
+            _resolve(future, result, error)
+
+    def _run_singly(self, items):
+        # One bad input shouldn't fail every request that happened to share its batch
+        outcomes = []
+        for item in items:
+            try:
+                outcomes.append((self.batch_fn([item])[0], None))
+            except Exception as e:
+                outcomes.append((None, e))
+        return outcomes
+
+    def _record(self, batch, started, finished, failed, stages):
+        metrics.BATCH_SIZE.observe(len(batch), batcher = self.name)
+        for _, _, queued, timings in batch:
+            metrics.QUEUE_WAIT_SECONDS.observe(started - queued, batcher = self.name)
+            if timings is not None:
+                # Each request sees its own wait plus the stages of the batch it rode in
+                timings.append(("queue_wait", started - queued))
+                timings.extend(stages)
+        with self._lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._failed_batches += int(failed)
+            self._batch_sizes[len(batch)] += 1
+            self._queue_waits.extend(started - queued for _, _, queued, _ in batch)
+            self._run_times.append(finished - started)
+
+    def stats(self):
+        """Batch-size and queue-wait numbers for tuning max_batch_size / max_wait_ms"""
+        with self._lock:
+            waits = sorted(self._queue_waits)
+            run_times = list(self._run_times)
+            return {
+                "max_batch_size" : self.max_batch_size,
+                "max_wait_ms" : self.max_wait * 1000,
+                "queue_depth" : self.queue_depth(),
+                "requests" : self._requests,
+                "batches" : self._batches,
+                "failed_batches" : self._failed_batches,
+                "mean_batch_size" : self._requests / self._batches if self._batches else 0.0,
+                "batch_size_histogram" : dict(sorted(self._batch_sizes.items())),
+                "queue_wait_ms" : {
+                    "mean" : 1000 * sum(waits) / len(waits) if waits else 0.0,
+                    "p50" : 1000 * _percentile(waits, 0.50),
+                    "p95" : 1000 * _percentile(waits, 0.95),
+                    "max" : 1000 * waits[-1] if waits else 0.0,
+                },
+                "batch_run_ms" : {
+                    "mean" : 1000 * sum(run_times) / len(run_times) if run_times else 0.0,
+                    "max" : 1000 * max(run_times) if run_times else 0.0,
+                },
+            }
+
+def _resolve(future, result = None, error = None):
+    # Already-resolved futures are left as they are
+    if future.done():
+        return
+    try:
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+    except InvalidStateError:
+        pass
+
+def _percentile(values, q):
+    # values must already be sorted
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import PyMongoError
+from utils import metrics
+
+class LRUCache():
+    """Thread-safe in-process LRU with optional per-entry TTL and hit/miss counters"""
+
+    def __init__(self, max_entries = 1024, ttl_seconds = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last = False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries" : len(self._data),
+            "max_entries" : self.max_entries,
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "evictions" : self.evictions,
+            "hit_rate" : self.hits / lookups if lookups else 0.0,
+        }
+
+class SummaryCache():
+    """
+    Content-addressed summary cache: an in-process LRU in front of a Mongo
+    collection. Mongo expires entries through the TTL index on `created_at`
+    that mongodb_config.ensure_indexes creates at startup.
+    """
+
+    def __init__(self, collection, max_entries = 1024, ttl_seconds = 7 * 24 * 3600):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.db_hits = 0
+        self.db_misses = 0
+        self.db_errors = 0
+
+    @staticmethod
+    def key(text, model_name, params):
+        payload = json.dumps({"model" : model_name, "params" : params}, sort_keys = True)
+        digest = hashlib.sha256(payload.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            metrics.CACHE_LOOKUPS.inc(result = "memory_hit")
+            return value
+        try:
+            doc = self.collection.find_one({"_id" : key}, {"summary" : 1, "created_at" : 1})
+        except PyMongoError as e:
+            # The persistent tier is best effort; a Mongo hiccup is just a miss
+            self.db_errors += 1
+            metrics.CACHE_LOOKUPS.inc(result = "error")
+            logging.warning(f"Summary cache lookup failed: {e}")
+            return None
+        if doc is None or _expired(doc.get("created_at"), self.ttl_seconds):
+            self.db_misses += 1
+            metrics.CACHE_LOOKUPS.inc(result = "miss")
+            return None
+        self.db_hits += 1
+        metrics.CACHE_LOOKUPS.inc(result = "mongo_hit")
+        self.memory.set(key, doc["summary"])
+        return doc["summary"]
+
+    def set(self, key, summary, model_name = None):
+        self.memory.set(key, summary)
+        try:
+            self.collection.update_one(
+                {"_id" : key},
+                {"$set" : {"summary" : summary, "model" : model_name, "created_at" : datetime.now(timezone.utc)}},
+                upsert = True
+            )
+        except PyMongoError as e:
+            self.db_errors += 1
+            logging.warning(f"Summary cache write failed: {e}")
+
+    def stats(self):
+        return {
+            "memory" : self.memory.stats(),
+            "mongo" : {
+                "hits" : self.db_hits,
+                "misses" : self.db_misses,
+                "errors" : self.db_errors,
+            },
+        }
+
+def _expired(created_at, ttl_seconds):
+    # Mongo's TTL monitor only runs once a minute, so double check here
+    if created_at is None:
+        return True
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo = timezone.utc)
+    return datetime.now(timezone.utc) - created_at > timedelta(seconds = ttl_seconds)
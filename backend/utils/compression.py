@@ -0,0 +1,79 @@
+import zlib
+from collections import deque
+from fastapi import HTTPException
+
+def gzip_decompressor():
+    # wbits 16 + MAX_WBITS expects a gzip header
+    return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+def inflate(decompressor, data, chunk_bytes):
+    """
+    Yields `data` inflated in pieces of at most `chunk_bytes`, so a small body
+    can't expand into one huge buffer. Raises zlib.error on invalid input.
+    """
+    out = decompressor.decompress(data, chunk_bytes)
+    while out:
+        yield out
+        out = decompressor.decompress(decompressor.unconsumed_tail, chunk_bytes)
+
+class GZipRequestMiddleware():
+    """
+    ASGI middleware that inflates `Content-Encoding: gzip` request bodies of the
+    given content types as they stream in. The inflated size is capped at
+    `max_bytes`, so a small compressed body can't expand into gigabytes.
+    Raw uploads (`/upload/stream`, audio) are left alone; they decode their own body.
+    """
+
+    def __init__(self, app, max_bytes, chunk_bytes = 1024 * 1024, content_types = ("application/json",)):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.chunk_bytes = chunk_bytes
+        self.content_types = tuple(content_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+        # The route sees a plain body: no encoding, length unknown up front
+        headers = [(name, value) for name, value in scope["headers"] if name not in (b"content-encoding", b"content-length")]
+        await self.app({**scope, "headers" : headers}, self._inflating(receive), send)
+
+    def _applies(self, scope):
+        headers = dict(scope["headers"])
+        encoding = headers.get(b"content-encoding", b"").decode("latin-1").strip().lower()
+        content_type = headers.get(b"content-type", b"").decode("latin-1").split(";")[0].strip().lower()
+        return encoding == "gzip" and content_type in self.content_types
+
+    def _inflating(self, receive):
+        inflater = gzip_decompressor()
+        pending = deque()
+        state = {"size" : 0, "more" : True, "done" : False}
+
+        def inflate_body(data):
+            try:
+                for out in inflate(inflater, data, self.chunk_bytes):
+                    state["size"] += len(out)
+                    if state["size"] > self.max_bytes:
+                        raise HTTPException(status_code = 413, detail = f"body is larger than {self.max_bytes} bytes")
+                    pending.append(out)
+            except zlib.error as e:
+                raise HTTPException(status_code = 400, detail = f"invalid gzip body: {e}")
+
+        async def inflated_receive():
+            if state["done"]:
+                # Body handed over; later calls wait for the disconnect
+                return await receive()
+            while not pending and state["more"]:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return message
+                inflate_body(message.get("body", b""))
+                state["more"] = message.get("more_body", False)
+                if not state["more"] and not inflater.eof:
+                    raise HTTPException(status_code = 400, detail = "truncated gzip body")
+            body = pending.popleft() if pending else b""
+            more = bool(pending) or state["more"]
+            state["done"] = not more
+            return {"type" : "http.request", "body" : body, "more_body" : more}
+
+        return inflated_receive
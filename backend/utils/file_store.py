@@ -0,0 +1,231 @@
+import codecs
+import hashlib
+import zlib
+import gridfs
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from utils import compression
+
+READ_CHUNK_BYTES = 1024 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+
+class UploadError(ValueError):
+    pass
+
+class UploadTooLarge(UploadError):
+    pass
+
+class UnsupportedUpload(UploadError):
+    pass
+
+# Stored files are summarized as text; binary parts are refused instead of decoded with replacement chars
+TEXT_CONTENT_TYPES = ("application/json", "application/xml", "application/octet-stream")
+
+def check_text_type(content_type):
+    mime = (content_type or "application/octet-stream").split(";")[0].strip().lower()
+    if not (mime.startswith("text/") or mime in TEXT_CONTENT_TYPES):
+        raise UnsupportedUpload(f"only text uploads are accepted, got {mime}")
+
+class GridFSSink():
+    """Writes one upload into GridFS piece by piece, hashing it on the way"""
+
+    def __init__(self, db, file_name, content_type = None, max_bytes = None):
+        self.db = db
+        self.file_name = file_name
+        self.content_type = content_type
+        self.max_bytes = max_bytes
+        self.sha256 = hashlib.sha256()
+        self.length = 0
+        # Checked as it streams in, so e.g. an octet-stream body of binary data is rejected too
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._stream = gridfs.GridFSBucket(db).open_upload_stream(file_name, metadata = {"content_type" : content_type})
+        self.gridfs_id = self._stream._id
+
+    def write(self, data):
+        self.length += len(data)
+        if self.max_bytes and self.length > self.max_bytes:
+            raise UploadTooLarge(f"upload is larger than {self.max_bytes} bytes")
+        try:
+            self._utf8.decode(data)
+        except UnicodeDecodeError:
+            raise UnsupportedUpload("upload is not UTF-8 text")
+        self.sha256.update(data)
+        self._stream.write(data)
+
+    def close(self):
+        try:
+            self._utf8.decode(b"", final = True)
+        except UnicodeDecodeError:
+            raise UnsupportedUpload("upload is not UTF-8 text")
+        self._stream.close()
+        # Only a reference goes into `files`; the content stays in GridFS
+        return self.db.files.insert_one({
+            "file_name" : self.file_name,
+            "gridfs_id" : self.gridfs_id,
+            "sha256" : self.sha256.hexdigest(),
+            "length" : self.length,
+            "content_type" : self.content_type
+        }).inserted_id
+
+    def abort(self):
+        self._stream.abort()
+
+class StreamingUpload():
+    """
+    Incremental upload body parser. `feed` takes raw body chunks as they arrive,
+    un-gzips them when `content_encoding` is gzip, pulls the `file` part out of
+    multipart/form-data (any other body is the file itself) and writes it to a
+    GridFSSink, so memory stays bounded by the chunk size.
+    """
+
+    def __init__(self, db, content_type, content_encoding = None, file_name = "upload", max_bytes = None):
+        self.db = db
+        self.file_name = file_name
+        self.max_bytes = max_bytes
+        self.fields = {}
+        self.sink = None
+
+        encoding = (content_encoding or "identity").lower()
+        if encoding not in ("identity", "gzip"):
+            raise UploadError(f"unsupported content encoding: {content_encoding}")
+        self._gunzip = compression.gzip_decompressor() if encoding == "gzip" else None
+
+        mime, params = parse_options_header(content_type or "application/octet-stream")
+        if mime == b"multipart/form-data":
+            if b"boundary" not in params:
+                raise UploadError("multipart body without a boundary")
+            self._part = None
+            self._parser = MultipartParser(params[b"boundary"], {
+                "on_part_begin" : self._on_part_begin,
+                "on_header_field" : self._on_header_field,
+                "on_header_value" : self._on_header_value,
+                "on_header_end" : self._on_header_end,
+                "on_headers_finished" : self._on_headers_finished,
+                "on_part_data" : self._on_part_data,
+                "on_part_end" : self._on_part_end,
+            })
+        else:
+            self._parser = None
+            check_text_type(mime.decode("latin-1"))
+            self.sink = GridFSSink(db, file_name, mime.decode("latin-1"), max_bytes)
+
+    def feed(self, data):
+        if self._gunzip is None:
+            self._write(data)
+            return
+        try:
+            for out in compression.inflate(self._gunzip, data, READ_CHUNK_BYTES):
+                self._write(out)
+        except zlib.error as e:
+            raise UploadError(f"invalid gzip body: {e}")
+
+    def close(self):
+        if self._gunzip is not None and not self._gunzip.eof:
+            raise UploadError("truncated gzip body")
+        if self._parser is not None:
+            self._parser.finalize()
+        if self.sink is None:
+            raise UploadError("multipart body has no file part")
+        return self.sink.close()
+
+    def abort(self):
+        if self.sink is not None:
+            self.sink.abort()
+
+    def _write(self, data):
+        if self._parser is None:
+            self.sink.write(data)
+            return
+        try:
+            written = self._parser.write(data)
+        except MultipartParseError as e:
+            raise UploadError(f"malformed multipart body: {e}")
+        if written != len(data):
+            raise UploadError("malformed multipart body")
+
+    # python-multipart callbacks; data arrives as (buffer, start, end) slices
+    def _on_part_begin(self):
+        self._part = {"headers" : {}, "field" : b"", "value" : b"", "data" : bytearray(), "is_file" : False}
+
+    def _on_header_field(self, data, start, end):
+        self._part["field"] += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._part["value"] += data[start:end]
+
+    def _on_header_end(self):
+        self._part["headers"][self._part["field"].lower()] = self._part["value"]
+        self._part["field"] = self._part["value"] = b""
+
+    def _on_headers_finished(self):
+        _, disposition = parse_options_header(self._part["headers"].get(b"content-disposition", b""))
+        self._part["name"] = disposition.get(b"name", b"").decode("utf-8", errors = "replace")
+        filename = disposition.get(b"filename")
+        if filename is not None and self.sink is None:
+            self._part["is_file"] = True
+            content_type = self._part["headers"].get(b"content-type", b"application/octet-stream").decode("latin-1")
+            check_text_type(content_type)
+            name = self.fields.get("file_name") or filename.decode("utf-8", errors = "replace") or self.file_name
+            self.sink = GridFSSink(self.db, name, content_type, self.max_bytes)
+
+    def _on_part_data(self, data, start, end):
+        if self._part["is_file"]:
+            self.sink.write(data[start:end])
+        elif len(self._part["data"]) + end - start <= MAX_FIELD_BYTES:
+            self._part["data"] += data[start:end]
+        else:
+            raise UploadError(f"form field '{self._part['name']}' is larger than {MAX_FIELD_BYTES} bytes")
+
+    def _on_part_end(self):
+        if not self._part["is_file"]:
+            self.fields[self._part["name"]] = self._part["data"].decode("utf-8", errors = "replace")
+
+def store_text(db, file_name, text, max_bytes = None):
+    """Writes a text already in memory to GridFS the way uploads are; returns the `files` _id"""
+    sink = GridFSSink(db, file_name, "text/plain; charset=utf-8", max_bytes)
+    try:
+        sink.write(text.encode("utf-8"))
+        return sink.close()
+    except BaseException:
+        sink.abort()
+        raise
+
+def iter_text(db, doc, chunk_bytes = READ_CHUNK_BYTES):
+    """Yields the text of a `files` document in blocks, from GridFS when it lives there"""
+    if "gridfs_id" not in doc:
+        yield doc["file_content"]
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")(errors = "replace")
+    with gridfs.GridFSBucket(db).open_download_stream(doc["gridfs_id"]) as stream:
+        while True:
+            data = stream.read(chunk_bytes)
+            if not data:
+                break
+            # The incremental decoder holds back a multi-byte character split across reads
+            text = decoder.decode(data)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final = True)
+    if tail:
+        yield tail
+
+def load_text(db, doc):
+    return "".join(iter_text(db, doc))
+
+async def load_text_async(db, doc, chunk_bytes = READ_CHUNK_BYTES):
+    """
+    load_text for an AsyncMongoClient database. Only uploads are streamed: the
+    summarizer needs the whole text, so it is read back as one string.
+    """
+    if "gridfs_id" not in doc:
+        return doc["file_content"]
+    decoder = codecs.getincrementaldecoder("utf-8")(errors = "replace")
+    parts = []
+    async with await gridfs.AsyncGridFSBucket(db).open_download_stream(doc["gridfs_id"]) as stream:
+        while True:
+            data = await stream.read(chunk_bytes)
+            if not data:
+                break
+            parts.append(decoder.decode(data))
+    parts.append(decoder.decode(b"", final = True))
+    return "".join(parts)
@@ -0,0 +1,38 @@
+import os
+import torch
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+FP32 = "fp32"
+INT8 = "int8"
+ONNX = "onnx"
+BACKENDS = (FP32, INT8, ONNX)
+
+def load_seq2seq(model_name, backend = FP32, device = torch.device("cpu"), onnx_dir = "onnx_models"):
+    """
+    Tokenizer and seq2seq model for one of the CPU inference backends:
+    fp32     plain PyTorch
+    int8     PyTorch with nn.Linear layers dynamically quantized to int8
+    onnx     ONNX Runtime graph exported once and cached under `onnx_dir`
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    if backend == ONNX:
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError:
+            raise ImportError("The onnx backend needs optimum[onnxruntime]: pip install optimum[onnxruntime]")
+        export_dir = os.path.join(onnx_dir, model_name.replace("/", "--"))
+        if os.path.isdir(export_dir):
+            model = ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+        else:
+            model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export = True)
+            model.save_pretrained(export_dir)
+        return tokenizer, model
+
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name).to(device).eval()
+    if backend == INT8:
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype = torch.qint8)
+    return tokenizer, model
@@ -0,0 +1,172 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+import torch
+from utils import file_store
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED_STATES = (DONE, FAILED)
+
+# Models owned by each worker process, loaded on the first job that needs them
+_worker_models = {}
+
+def _init_worker(torch_threads):
+    torch.set_num_threads(torch_threads)
+
+def _worker_model(kind):
+    if kind not in _worker_models:
+        from utils import Generate_summary
+        if kind == "summarize":
+            _worker_models[kind] = Generate_summary.Generate_summary()
+        else:
+            _worker_models[kind] = Generate_summary.changelang()
+    return _worker_models[kind]
+
+def _run_job(kind, text, params):
+    from utils import preprocess, long_document
+
+    if kind == "translate":
+        return _worker_model(kind).change_language(text, params["language"])
+
+    summary = _worker_model(kind)
+    if params.get("mode") == "long":
+        # Inside a worker the map step runs as batched generate instead of another pool
+        long_summary = long_document.LongDocumentSummarizer(
+            summary.tokenizer,
+            summary.summury_generated,
+            chunk_tokens = params.get("chunk_tokens", 4000),
+            map_fn = summary.summury_generated_batch
+        )
+        return long_summary.summarize(preprocess.get_engine().sentences(text))
+    return summary.summury_generated(preprocess.preprocess_text(text))
+
+class JobError(Exception):
+    pass
+
+def new_job(kind, payload):
+    """A job document ready to insert into `jobs`; JobManager.dispatch runs it"""
+    return {
+        "kind" : kind,
+        "payload" : payload,
+        "status" : QUEUED,
+        "result" : None,
+        "error" : None,
+        "created_at" : datetime.now(timezone.utc),
+    }
+
+def job_view(job):
+    # What the job routes return: no payload, _id as a string job_id
+    if job is not None:
+        job.pop("payload", None)
+        job["job_id"] = str(job.pop("_id"))
+    return job
+
+class JobManager():
+    """
+    Persistent summarize/translate jobs executed on a pool of model-holding
+    worker processes. Job state lives in Mongo, so queued and running jobs are
+    picked up again after an API restart.
+    """
+
+    def __init__(self, db, max_workers = 1, torch_threads = 0, chunk_tokens = 4000):
+        self.db = db
+        self.jobs = db.jobs
+        self.max_workers = max(1, max_workers)
+        self.torch_threads = torch_threads or max(1, (multiprocessing.cpu_count() or 1) // self.max_workers)
+        self.chunk_tokens = chunk_tokens
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers = self.max_workers,
+                    mp_context = multiprocessing.get_context("spawn"),
+                    initializer = _init_worker,
+                    initargs = (self.torch_threads,)
+                )
+        self.recover()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                # Unfinished jobs stay queued/running in Mongo and are recovered on the next start
+                self._pool.shutdown(wait = False, cancel_futures = True)
+                self._pool = None
+
+    def recover(self):
+        for job in self.jobs.find({"status" : {"$in" : [QUEUED, RUNNING]}}).sort("created_at", 1):
+            logging.info(f"Re-queueing job {job['_id']} ({job['kind']})")
+            self.dispatch(job)
+
+    def submit(self, kind, payload):
+        job = new_job(kind, payload)
+        job["_id"] = self.jobs.insert_one(job).inserted_id
+        self.dispatch(job)
+        return str(job["_id"])
+
+    def get(self, job_id):
+        try:
+            return job_view(self.jobs.find_one({"_id" : ObjectId(job_id)}, {"payload" : 0}))
+        except InvalidId:
+            return None
+
+    def _load_text(self, job):
+        payload = job["payload"]
+        if job["kind"] == "summarize":
+            doc = self.db.files.find_one({"_id" : ObjectId(payload["file_id"])}, {"file_content" : 1, "gridfs_id" : 1})
+        else:
+            doc = self.db.summary.find_one({"_id" : ObjectId(payload["id"])}, {"file_content" : 1})
+        if not doc:
+            raise JobError("file not found")
+        return file_store.load_text(self.db, doc)
+
+    def dispatch(self, job):
+        """Hands an inserted job to the pool. Blocking: it reads the text from Mongo/GridFS"""
+        job_id = job["_id"]
+        try:
+            text = self._load_text(job)
+            params = dict(job["payload"], chunk_tokens = self.chunk_tokens)
+            # Marked before submitting so a fast job can't have its result overwritten
+            self.jobs.update_one({"_id" : job_id}, {"$set" : {"status" : RUNNING, "started_at" : datetime.now(timezone.utc)}})
+            future = self._pool.submit(_run_job, job["kind"], text, params)
+        except Exception as e:
+            self._set_finished(job_id, error = str(e))
+            return
+        future.add_done_callback(partial(self._on_done, job))
+
+    def _on_done(self, job, future):
+        if future.cancelled():
+            # Pool shut down before the job ran; leave it for recovery
+            return
+        error = future.exception()
+        if error is not None:
+            logging.warning(f"Job {job['_id']} failed: {error}")
+            self._set_finished(job["_id"], error = str(error))
+            return
+        result = future.result()
+        if job["kind"] == "summarize":
+            # Same record /api/upload_summury would have written, so translation can find it
+            self.db.summary.update_one(
+                {"_id" : ObjectId(job["payload"]["file_id"])},
+                {"$set" : {"file_content" : result}},
+                upsert = True
+            )
+        self._set_finished(job["_id"], result = result)
+
+    def _set_finished(self, job_id, result = None, error = None):
+        self.jobs.update_one({"_id" : job_id}, {"$set" : {
+            "status" : FAILED if error is not None else DONE,
+            "result" : result,
+            "error" : error,
+            "finished_at" : datetime.now(timezone.utc),
+        }})
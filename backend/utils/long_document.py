@@ -0,0 +1,103 @@
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import torch
+from utils import Generate_summary
+
+# Summary model owned by each pool worker, loaded once in _init_worker
+_worker_summary = None
+
+def _init_worker(torch_threads):
+    global _worker_summary
+    torch.set_num_threads(torch_threads)
+    _worker_summary = Generate_summary.Generate_summary()
+
+def _summarize_chunk(chunk):
+    return _worker_summary.summury_generated(chunk)
+
+class LongDocumentSummarizer():
+    """
+    Map-reduce summarization for documents longer than the model's 4096 token window.
+    Sentences are packed into token-budgeted chunks, the chunks are summarized in
+    parallel on a process pool and the partial summaries are summarized again until
+    everything fits in one chunk.
+    """
+
+    def __init__(self, tokenizer, summarize_fn, max_workers = 2, torch_threads = 0, chunk_tokens = 4000, map_fn = None):
+        self.tokenizer = tokenizer
+        # Used for the final (single chunk) pass so it can share the main model
+        self.summarize_fn = summarize_fn
+        # Optional in-process replacement for the pool, e.g. a batched generate
+        self.map_fn = map_fn
+        self.max_workers = max(1, max_workers)
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.max_workers)
+        self.chunk_tokens = chunk_tokens
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers = self.max_workers,
+                        mp_context = multiprocessing.get_context("spawn"),
+                        initializer = _init_worker,
+                        initargs = (self.torch_threads,)
+                    )
+        return self._pool
+
+    def chunk(self, sentences):
+        """Greedily pack sentences into chunks of at most `chunk_tokens` tokens"""
+        if not sentences:
+            return []
+        token_ids = self.tokenizer(list(sentences), add_special_tokens = False)["input_ids"]
+
+        chunks = []
+        current = []
+        current_tokens = 0
+        for sentence, ids in zip(sentences, token_ids):
+            if len(ids) > self.chunk_tokens:
+                # A single sentence over budget is cut on token boundaries
+                if current:
+                    chunks.append(" ".join(current))
+                    current, current_tokens = [], 0
+                for start in range(0, len(ids), self.chunk_tokens):
+                    chunks.append(self.tokenizer.decode(ids[start:start + self.chunk_tokens]))
+                continue
+            if current and current_tokens + len(ids) > self.chunk_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(sentence)
+            current_tokens += len(ids)
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
+
+    def summarize(self, sentences):
+        chunk = self.reduce(sentences)
+        return self.summarize_fn(chunk) if chunk else ""
+
+    def reduce(self, sentences):
+        """Map-reduce until a single chunk is left; that chunk still needs its final summary"""
+        chunks = self.chunk(sentences)
+        if not chunks:
+            return ""
+        while len(chunks) > 1:
+            if self.map_fn is not None:
+                partials = list(self.map_fn(chunks))
+            else:
+                partials = list(self._get_pool().map(_summarize_chunk, chunks))
+            # Partial summaries are the units for the next level
+            reduced = self.chunk(partials)
+            if len(reduced) >= len(chunks):
+                # Budget too small to pack the partials; pair them so every level shrinks
+                reduced = [" ".join(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+            chunks = reduced
+        return chunks[0]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures = True)
+            self._pool = None
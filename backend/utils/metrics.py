@@ -0,0 +1,215 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-request list of (stage, seconds), installed by ServerTimingMiddleware
+_request_timings = contextvars.ContextVar("request_timings", default = None)
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+RATE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+class Histogram():
+    def __init__(self, name, help, buckets, labelnames = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key : (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{_labels(labels + [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(labels + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+class Counter():
+    def __init__(self, name, help, labelnames = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(list(zip(self.labelnames, key)))} {_number(value)}")
+        return lines
+
+class Gauge():
+    """
+    Evaluated only at scrape time. `callback` returns a number, or a list of
+    (labels dict, number) pairs for labelled series.
+    """
+
+    def __init__(self, name, help, callback):
+        self.name = name
+        self.help = help
+        self.callback = callback
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        value = self.callback()
+        samples = value if isinstance(value, list) else [({}, value)]
+        for labels, sample in samples:
+            if sample is not None:
+                lines.append(f"{self.name}{_labels(list(labels.items()))} {_number(sample)}")
+        return lines
+
+class Registry():
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        # Re-registering a name replaces the old metric, e.g. on module reload
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "summarizer_stage_seconds", "Time spent per pipeline stage", LATENCY_BUCKETS, ["stage"]))
+REQUEST_SECONDS = registry.register(Histogram(
+    "summarizer_request_seconds", "HTTP request latency", LATENCY_BUCKETS, ["method", "path", "status"]))
+INPUT_TOKENS = registry.register(Histogram(
+    "summarizer_input_tokens", "Input tokens per sequence", TOKEN_BUCKETS, ["model"]))
+OUTPUT_TOKENS = registry.register(Histogram(
+    "summarizer_output_tokens", "Generated tokens per sequence", TOKEN_BUCKETS, ["model"]))
+TOKENS_PER_SECOND = registry.register(Histogram(
+    "summarizer_generate_tokens_per_second", "Generated tokens per second of generate()", RATE_BUCKETS, ["model"]))
+BATCH_SIZE = registry.register(Histogram(
+    "summarizer_batch_size", "Requests per model batch", SIZE_BUCKETS, ["batcher"]))
+QUEUE_WAIT_SECONDS = registry.register(Histogram(
+    "summarizer_batch_queue_wait_seconds", "Time a request waited for its batch", LATENCY_BUCKETS, ["batcher"]))
+CACHE_LOOKUPS = registry.register(Counter(
+    "summarizer_cache_lookups_total", "Summary cache lookups", ["result"]))
+
+def gauge(name, help, callback):
+    return registry.register(Gauge(name, help, callback))
+
+@contextmanager
+def stage(name):
+    """Times the block into the stage histogram and the current request's Server-Timing"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage = name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+def request_timings():
+    """The current request's (stage, seconds) list, or None outside a request"""
+    return _request_timings.get()
+
+@contextmanager
+def collect_timings():
+    """
+    Gathers the stages timed inside the block into a fresh list, for work done on
+    a thread with no request of its own (e.g. the micro-batcher) to hand back.
+    """
+    timings = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+def record_generation(model, input_tokens, output_tokens, seconds):
+    for count in input_tokens:
+        INPUT_TOKENS.observe(count, model = model)
+    for count in output_tokens:
+        OUTPUT_TOKENS.observe(count, model = model)
+    if seconds > 0:
+        TOKENS_PER_SECOND.observe(sum(output_tokens) / seconds, model = model)
+
+class ServerTimingMiddleware():
+    """
+    ASGI middleware that records request latency and adds a Server-Timing header
+    with every stage timed while handling the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = []
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                header = ", ".join(f"{name};dur={1000 * seconds:.1f}" for name, seconds in timings)
+                header = ", ".join(filter(None, [header, f"total;dur={1000 * (time.perf_counter() - started):.1f}"]))
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method = scope["method"],
+                path = route.path if route is not None else "unmatched",
+                status = str(status[0])
+            )
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
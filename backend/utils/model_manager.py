@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+import psutil
+import torch
+
+PENDING = "pending"
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+class ModelNotReady(Exception):
+    def __init__(self, name, state):
+        super().__init__(f"model '{name}' is {state}")
+        self.name = name
+        self.state = state
+
+class ModelSlot():
+    def __init__(self, name, loader, warmup = None):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.model = None
+        self.state = PENDING
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.memory_bytes = None
+        self.backend = None
+        self._ready = threading.Event()
+
+    def get(self):
+        if self.state != READY:
+            raise ModelNotReady(self.name, self.state)
+        return self.model
+
+    def wait(self, timeout = None):
+        return self._ready.wait(timeout)
+
+    def load(self):
+        try:
+            self.state = LOADING
+            started = time.perf_counter()
+            model = self.loader()
+            self.load_seconds = time.perf_counter() - started
+            self.memory_bytes = model_footprint(model)
+            self.backend = getattr(model, "backend", None)
+
+            if self.warmup is not None:
+                # First generate calls pay for kernel selection and allocator growth
+                self.state = WARMING
+                started = time.perf_counter()
+                self.warmup(model)
+                self.warmup_seconds = time.perf_counter() - started
+
+            self.model = model
+            self.state = READY
+        except Exception as e:
+            logging.exception(f"Loading model '{self.name}' failed")
+            self.error = str(e)
+            self.state = FAILED
+        finally:
+            self._ready.set()
+
+    def status(self):
+        return {
+            "state" : self.state,
+            "backend" : self.backend,
+            "load_seconds" : self.load_seconds,
+            "warmup_seconds" : self.warmup_seconds,
+            "memory_bytes" : self.memory_bytes,
+            "error" : self.error,
+        }
+
+class ModelManager():
+    """
+    Loads registered models on a background thread after the API is up, so the
+    port binds immediately and /health can report per-model readiness.
+    """
+
+    def __init__(self):
+        self.slots = {}
+        self._thread = None
+
+    def register(self, name, loader, warmup = None):
+        slot = ModelSlot(name, loader, warmup)
+        self.slots[name] = slot
+        return slot
+
+    def get(self, name):
+        return self.slots[name].get()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target = self._load_all, name = "model-loader", daemon = True)
+            self._thread.start()
+
+    def _load_all(self):
+        for slot in list(self.slots.values()):
+            slot.load()
+
+    def ready(self):
+        return all(slot.state == READY for slot in self.slots.values())
+
+    def state(self):
+        states = [slot.state for slot in self.slots.values()]
+        if FAILED in states:
+            return FAILED
+        return READY if all(state == READY for state in states) else LOADING
+
+    def status(self):
+        return {name : slot.status() for name, slot in self.slots.items()}
+
+def model_footprint(obj):
+    """Parameter and buffer bytes of every torch module held by `obj`"""
+    modules = [obj] if isinstance(obj, torch.nn.Module) else [
+        value for value in vars(obj).values() if isinstance(value, torch.nn.Module)
+    ]
+    if not modules:
+        # e.g. an ONNX Runtime session; its memory only shows up in process RSS
+        return None
+    # state_dict also covers the packed weights of dynamically quantized layers
+    return sum(_tensor_bytes(value) for module in modules for value in module.state_dict().values())
+
+def _tensor_bytes(value):
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v) for v in value)
+    return 0
+
+def process_memory_bytes():
+    return psutil.Process().memory_info().rss
+
+manager = ModelManager()
@@ -1,39 +1,105 @@
 import re
+import threading
 import spacy
 import contractions
+from config import model_config
+
+# Components the summary pipeline never uses; only sentence boundaries are needed
+_UNUSED_COMPONENTS = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"]
+
+# URLs, promotional lines and boilerplate notices, removed in a single pass. This runs
+# before whitespace is collapsed, so multi-word phrases allow any whitespace run
+# between words (the old chain matched "E-mail to a friend" on normalized text)
+_BOILERPLATE_RE = re.compile(
+    r"http\S+|www\S+|watch.*?»"
+    r"|Copyright.*?reserved\."
+    r"|This material.*?redistributed"
+    r"|E-mail\s+to\s+a\s+friend\s*\.*",
+    flags = re.IGNORECASE
+)
+# Whitespace runs and non-ASCII runs both collapse to a single space
+_SPACE_RE = re.compile(r"(?:\s|[^\x00-\x7F])+")
+# Runs of dots become one dot, single-letter tokens are dropped
+_DOTS_AND_LETTERS_RE = re.compile(r"(\.)\.+|\b\w\b")
+_QUOTES = str.maketrans({"’": "'", "‘": "'", "“": '"', "”": '"'})
+
+class PreprocessEngine():
+    """
+    Text cleaning and sentence segmentation with the spaCy pipeline loaded once.
+    Only the sentence segmenter is kept enabled.
+    """
+
+    def __init__(self, model = "en_core_web_sm", batch_size = 32, piece_chars = 100000):
+        self.nlp = spacy.load(model, exclude = _UNUSED_COMPONENTS)
+        if "senter" in self.nlp.component_names:
+            self.nlp.enable_pipe("senter")
+        if not self.nlp.has_pipe("senter") and not self.nlp.has_pipe("sentencizer"):
+            self.nlp.add_pipe("sentencizer")
+        self.batch_size = batch_size
+        # Long documents go through the pipeline in pieces so nlp.max_length never trips
+        self.piece_chars = min(piece_chars, self.nlp.max_length)
+
+    def clean(self, text):
+        text = _BOILERPLATE_RE.sub("", text)
+        text = text.translate(_QUOTES)
+        text = _SPACE_RE.sub(" ", text).strip()
+        # Lowercase pronoun 'i' used to be fixed here, but the single-letter
+        # removal below dropped it again, so that pass is gone.
+        text = _DOTS_AND_LETTERS_RE.sub(r"\1", text)
+        return contractions.fix(text)
+
+    def sentences(self, text):
+        return self.sentences_many([text])[0]
+
+    def sentences_many(self, texts):
+        # Every document becomes one or more pieces; track which doc each piece belongs to
+        owners = []
+        pieces = []
+        for i, text in enumerate(texts):
+            for piece in _split_pieces(self.clean(text), self.piece_chars):
+                owners.append(i)
+                pieces.append(piece)
+
+        results = [[] for _ in texts]
+        for owner, doc in zip(owners, self.nlp.pipe(pieces, batch_size = self.batch_size)):
+            results[owner].extend(
+                sent.text.strip().capitalize() for sent in doc.sents if sent.text.strip()
+            )
+        return results
+
+    def preprocess(self, text):
+        return " ".join(self.sentences(text))
+
+    def preprocess_many(self, texts):
+        return [" ".join(sentences) for sentences in self.sentences_many(texts)]
+
+def _split_pieces(text, limit):
+    # Cut at the last sentence end (or space) before `limit` characters
+    pieces = []
+    while len(text) > limit:
+        cut = text.rfind(". ", 0, limit)
+        cut = cut + 1 if cut > 0 else text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = PreprocessEngine(model_config.spacy_model)
+    return _engine
 
 def preprocess_text(text):
-    # Load small English model
-    nlp = spacy.load("en_core_web_sm")
-    # 1. Remove URLs and promotional lines
-    text = re.sub(r"http\S+|www\S+|watch.*?»", "", text, flags=re.IGNORECASE)
-
-    # 2. Remove boilerplate/copyright notices
-    text = re.sub(r"Copyright.*?reserved\.", "", text, flags=re.IGNORECASE)
-    text = re.sub(r"This material.*?redistributed", "", text, flags=re.IGNORECASE)
-
-    # 3. Normalize quotes/apostrophes
-    text = text.replace("’", "'").replace("‘", "'")
-    text = text.replace("“", '"').replace("”", '"')
-
-    # 4. Normalize whitespace
-    text = re.sub(r"\s+", " ", text).strip()
-
-    # Fix lowercase 'i' when it’s a pronoun
-    text = re.sub(r"\bi\b", "I", text)
-
-    # Remove trailing junk
-    text = re.sub(r"E-mail to a friend\s*\.*", "", text, flags=re.IGNORECASE)
-    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
-    text = re.sub(r"\.\.+", ".", text)
-    text = re.sub(r"\b\w\b", "", text)  # Remove single-letter tokens (can hurt if text has acronyms)
-    text = contractions.fix(text)
-
-    # 5. Sentence segmentation using spaCy
-    doc = nlp(text)
-    sentences = [sent.text.strip().capitalize() for sent in doc.sents if sent.text.strip()]
-    
-    # 6. Join cleaned sentences
-    clean_text = " ".join(sentences)
-
-    return clean_text
\ No newline at end of file
+    return get_engine().preprocess(text)
+
+def preprocess_many(texts):
+    return get_engine().preprocess_many(texts)
@@ -0,0 +1,8 @@
+import json
+
+def format_event(data, event = None):
+    """One server-sent event; `data` is JSON encoded so newlines can't break the frame"""
+    message = f"data: {json.dumps(data, default = str)}\n\n"
+    if event is not None:
+        message = f"event: {event}\n" + message
+    return message
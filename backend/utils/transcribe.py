@@ -0,0 +1,269 @@
+import io
+import multiprocessing
+import shutil
+import subprocess
+import threading
+import wave
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import torch
+
+SAMPLE_RATE = 16000
+MAX_SEGMENT_SECONDS = 30  # Whisper's input window
+
+class AudioError(ValueError):
+    pass
+
+def decode_audio(data):
+    """Any container/codec ffmpeg reads -> float32 mono at 16 kHz. 16-bit WAV skips ffmpeg."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            return _decode_wav(data)
+        except wave.Error:
+            pass  # e.g. float or 24-bit WAV; ffmpeg can read those
+    return _decode_ffmpeg(data)
+
+def _decode_wav(data):
+    with wave.open(io.BytesIO(data)) as w:
+        if w.getsampwidth() != 2:
+            raise wave.Error("only 16-bit PCM is read without ffmpeg")
+        channels, rate = w.getnchannels(), w.getframerate()
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype = np.int16)
+    audio = pcm.reshape(-1, channels).mean(axis = 1, dtype = np.float32) / 32768.0
+    return resample(audio, rate)
+
+def _decode_ffmpeg(data):
+    return np.concatenate(list(_ffmpeg_stream([data]))) if data else np.zeros(0, dtype = np.float32)
+
+FFMPEG_COMMAND = [
+    "ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+    "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"
+]
+
+def decode_stream(chunks, block_seconds = MAX_SEGMENT_SECONDS):
+    """
+    Compressed audio arriving as byte chunks -> float32 16 kHz mono blocks of
+    `block_seconds`, decoded by one ffmpeg pipe while the upload is still coming in.
+    Without ffmpeg only 16-bit WAV can be read, and then only as a whole.
+    """
+    if shutil.which("ffmpeg") is None:
+        data = b"".join(chunks)
+        if not (data[:4] == b"RIFF" and data[8:12] == b"WAVE"):
+            raise AudioError("ffmpeg is not installed; only 16-bit PCM WAV can be read")
+        yield decode_audio(data)
+        return
+    yield from _ffmpeg_stream(chunks, block_seconds)
+
+def _ffmpeg_stream(chunks, block_seconds = MAX_SEGMENT_SECONDS):
+    try:
+        process = subprocess.Popen(FFMPEG_COMMAND, stdin = subprocess.PIPE, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+    except FileNotFoundError:
+        raise AudioError("ffmpeg is not installed; only 16-bit PCM WAV can be read")
+
+    # stdin is fed from a thread so a full stdout pipe can never block the upload
+    feed_errors = []
+    def feed():
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg stopped reading; its exit code and stderr say why
+        except Exception as e:
+            feed_errors.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+    feeder = threading.Thread(target = feed, name = "ffmpeg-feed", daemon = True)
+    feeder.start()
+
+    # stderr is drained alongside, keeping only its last 8KB, so a noisy decode can't fill the pipe and stall ffmpeg
+    stderr_tail = deque(maxlen = 2)
+    def drain():
+        for data in iter(lambda: process.stderr.read1(4096), b""):
+            stderr_tail.append(data)
+    drainer = threading.Thread(target = drain, name = "ffmpeg-stderr", daemon = True)
+    drainer.start()
+
+    block_bytes = block_seconds * SAMPLE_RATE * 2
+    try:
+        while True:
+            pcm = process.stdout.read(block_bytes)
+            if not pcm:
+                break
+            yield np.frombuffer(pcm, dtype = np.int16).astype(np.float32) / 32768.0
+        feeder.join()
+        if feed_errors:
+            raise feed_errors[0]
+        if process.wait() != 0:
+            drainer.join()
+            raise AudioError(f"could not decode audio: {b''.join(stderr_tail).decode(errors = 'replace').strip()}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        drainer.join()
+        process.stdout.close()
+        process.stderr.close()
+
+def resample(audio, rate, target = SAMPLE_RATE):
+    if rate == target:
+        return audio.astype(np.float32, copy = False)
+    positions = np.arange(0, len(audio), rate / target)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+def detect_speech(audio, frame_ms = 30, min_silence_ms = 500, pad_ms = 200, max_seconds = MAX_SEGMENT_SECONDS):
+    """
+    Energy-based VAD. Returns (start, end) sample ranges of speech, cut at
+    silences and packed into segments of at most `max_seconds`, so every
+    segment fills one Whisper window as far as the pauses allow.
+    """
+    frame = SAMPLE_RATE * frame_ms // 1000
+    count = len(audio) // frame
+    if count == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    frames = audio[:count * frame].reshape(count, frame)
+    energy = 10 * np.log10(np.mean(frames ** 2, axis = 1) + 1e-10)
+    # Threshold relative to the recording's own noise floor and loud parts
+    floor, loud = np.percentile(energy, 10), np.percentile(energy, 90)
+    speech = energy > max(floor + 6, floor + 0.25 * (loud - floor))
+    if not speech.any():
+        return []
+
+    # Speech runs, with gaps shorter than min_silence_ms bridged
+    min_gap = max(1, min_silence_ms // frame_ms)
+    runs = []
+    for index in np.flatnonzero(speech):
+        if runs and index - runs[-1][1] <= min_gap:
+            runs[-1][1] = index + 1
+        else:
+            runs.append([index, index + 1])
+
+    max_frames = max_seconds * 1000 // frame_ms
+    pad = pad_ms // frame_ms
+    runs = [part for start, end in runs for part in _split_long(energy, start, end, max_frames - 2 * pad)]
+
+    # Pack neighbouring runs into one segment while it still fits the window
+    segments = []
+    for start, end in runs:
+        start, end = max(0, start - pad), min(count, end + pad)
+        if segments and end - segments[-1][0] <= max_frames:
+            segments[-1][1] = end
+        else:
+            segments.append([start, end])
+    return [(start * frame, min(len(audio), end * frame)) for start, end in segments]
+
+def _split_long(energy, start, end, max_frames):
+    # A run without a usable pause is cut at its quietest frame in the back half of the window
+    parts = []
+    while end - start > max_frames:
+        window = energy[start + max_frames // 2:start + max_frames]
+        cut = start + max_frames // 2 + int(np.argmin(window))
+        parts.append((start, cut))
+        start = cut
+    parts.append((start, end))
+    return parts
+
+def load_whisper(model_name):
+    from transformers import WhisperForConditionalGeneration, WhisperProcessor
+    processor = WhisperProcessor.from_pretrained(model_name)
+    model = WhisperForConditionalGeneration.from_pretrained(model_name).eval()
+    return processor.feature_extractor, processor.tokenizer, model
+
+# Model owned by each worker process, loaded once by the pool initializer
+_worker_model = None
+
+def _init_worker(loader, model_name, torch_threads):
+    global _worker_model
+    torch.set_num_threads(torch_threads)
+    _worker_model = loader(model_name)
+
+def _transcribe_segment(audio):
+    feature_extractor, tokenizer, model = _worker_model
+    features = feature_extractor(audio, sampling_rate = SAMPLE_RATE, return_tensors = "pt").input_features
+    with torch.inference_mode():
+        ids = model.generate(features)
+    return tokenizer.batch_decode(ids, skip_special_tokens = True)[0].strip()
+
+class Transcriber():
+    """
+    Splits audio on silence and transcribes the segments in parallel on a pool
+    of Whisper worker processes. Segments come back in order with their
+    timestamps in the original recording.
+    """
+
+    def __init__(self, model_name, max_workers = 2, torch_threads = 0, min_silence_ms = 500, loader = load_whisper):
+        self.model_name = model_name
+        self.max_workers = max(1, max_workers)
+        self.torch_threads = torch_threads or max(1, (multiprocessing.cpu_count() or 1) // self.max_workers)
+        self.min_silence_ms = min_silence_ms
+        self.loader = loader
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        # Requests run on concurrent threadpool threads; only one of them may start the workers
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers = self.max_workers,
+                        mp_context = multiprocessing.get_context("spawn"),
+                        initializer = _init_worker,
+                        initargs = (self.loader, self.model_name, self.torch_threads)
+                    )
+        return self._pool
+
+    def transcribe(self, audio):
+        """Yields {"start", "end", "text"} per speech segment, in order, as each one finishes"""
+        return self.transcribe_stream([audio])
+
+    def transcribe_stream(self, blocks):
+        """
+        Same as `transcribe` for audio arriving in blocks (see `decode_stream`).
+        Segments are cut and submitted as soon as a later pause closes them, so
+        transcription overlaps the upload and only a few windows stay in memory.
+        """
+        window = MAX_SEGMENT_SECONDS * SAMPLE_RATE
+        pool = self._get_pool()
+        pending = deque()
+        buffer = np.zeros(0, dtype = np.float32)
+        offset = 0  # position of buffer[0] in the recording
+
+        def submit(segments):
+            for start, end in segments:
+                pending.append((offset + start, offset + end, pool.submit(_transcribe_segment, buffer[start:end])))
+
+        def result(start, end, future):
+            return {"start" : round(start / SAMPLE_RATE, 2), "end" : round(end / SAMPLE_RATE, 2), "text" : future.result()}
+
+        try:
+            for block in blocks:
+                buffer = np.concatenate([buffer, block]) if len(buffer) else block
+                if len(buffer) >= 2 * window:
+                    # A segment running into the last second may go on in the next block; keep it back
+                    segments = detect_speech(buffer, min_silence_ms = self.min_silence_ms)
+                    keep = len(buffer) - SAMPLE_RATE
+                    if segments and segments[-1][1] >= keep:
+                        keep = segments.pop()[0]
+                    submit(segments)
+                    buffer = buffer[keep:].copy()
+                    offset += keep
+                while pending and pending[0][2].done():
+                    yield result(*pending.popleft())
+            submit(detect_speech(buffer, min_silence_ms = self.min_silence_ms))
+            while pending:
+                yield result(*pending.popleft())
+        finally:
+            # Client went away: don't transcribe the rest
+            for _, _, future in pending:
+                future.cancel()
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait = False, cancel_futures = True)
+                self._pool = None
@@ -0,0 +1,83 @@
+"""
+DecoderLSTM attention step: concatenated attention vs the cached encoder projection.
+
+    python benchmarks/bench_attention.py [--src-len 5000] [--batch-size 4] [--steps 50] [--threads 0]
+
+"concat" is the original forward() (benchmarks/lstm_reference.py): expand h to src_len, cat
+with the encoder outputs and run self.attention over (batch, src_len, 2*hidden) every step.
+"cached" is forward() with encoder_keys = project_encoder(encoder_outputs) computed once
+before the loop (its cost is included). Both decode --steps tokens from the same states;
+tests/test_attention.py checks they give the same logits and states. Memory is the bytes
+allocated per step, from the profiler.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import torch
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import lstm_reference  # noqa: E402
+from model.summurizer import DecoderLSTM  # noqa: E402
+
+VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_SIZE = 2000, 128, 256
+
+def cached_step(decoder, encoder_keys):
+    return lambda input_token, hidden_state, encoder_outputs: decoder(
+        input_token, hidden_state, encoder_outputs, encoder_keys = encoder_keys)
+
+@torch.no_grad()
+def decode(step, tokens, hidden, encoder_outputs, steps):
+    outputs = []
+    for _ in range(steps):
+        logits, hidden = step(tokens, hidden, encoder_outputs)
+        tokens = logits[:, -1].argmax(dim = -1, keepdim = True)
+        outputs.append(logits)
+    return torch.cat(outputs, dim = 1), hidden
+
+def allocated_bytes(fn):
+    with torch.profiler.profile(activities = [torch.profiler.ProfilerActivity.CPU], profile_memory = True) as prof:
+        fn()
+    return sum(max(0, event.cpu_memory_usage) for event in prof.events())
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--src-len", type = int, default = 5000)
+    parser.add_argument("--batch-size", type = int, default = 4)
+    parser.add_argument("--steps", type = int, default = 50)
+    parser.add_argument("--threads", type = int, default = 0, help = "torch threads, default: torch's choice")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    torch.manual_seed(0)
+    decoder = DecoderLSTM(VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_SIZE).eval()
+    encoder_outputs = torch.randn(args.batch_size, args.src_len, HIDDEN_SIZE)
+    hidden = (torch.randn(1, args.batch_size, HIDDEN_SIZE), torch.randn(1, args.batch_size, HIDDEN_SIZE))
+    tokens = torch.randint(0, VOCAB_SIZE, (args.batch_size, 1))
+
+    def run_concat(steps):
+        return decode(lambda *a: lstm_reference.decoder_step(decoder, *a), tokens, hidden, encoder_outputs, steps)
+
+    def run_cached(steps):
+        with torch.no_grad():
+            encoder_keys = decoder.project_encoder(encoder_outputs)
+        return decode(cached_step(decoder, encoder_keys), tokens, hidden, encoder_outputs, steps)
+
+    print(f"batch {args.batch_size}, src_len {args.src_len}, {args.steps} steps")
+    print(f"{'method':<10}{'ms/step':>10}{'MB alloc/step':>16}")
+    rows = []
+    for name, run in (("concat", run_concat), ("cached", run_cached)):
+        started = time.perf_counter()
+        run(args.steps)
+        per_step = (time.perf_counter() - started) / args.steps
+        memory = allocated_bytes(lambda: run(5)) / 5
+        rows.append(per_step)
+        print(f"{name:<10}{1000 * per_step:>10.2f}{memory / 2**20:>16.1f}")
+    print(f"speed-up: {rows[0] / rows[1]:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Accuracy, latency and memory of the CPU inference backends (fp32, int8, onnx).
+
+    python benchmarks/bench_backends.py [--task summary|translate] [--backends fp32 int8 onnx]
+                                        [--max-rouge-drop 0.05]
+
+Every backend runs over the fixed corpus test/test1-5.txt. Outputs are scored with
+ROUGE-1/2/L F1 against the fp32 outputs, so the numbers are the quality lost by the
+backend, not the quality of the model. Exits non-zero if any backend's ROUGE-L drops
+by more than --max-rouge-drop.
+"""
+import argparse
+import gc
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import psutil
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from utils import Generate_summary, preprocess  # noqa: E402
+from utils.model_manager import model_footprint  # noqa: E402
+
+def _ngrams(tokens, n):
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+def rouge_n(reference, candidate, n):
+    ref, cand = _ngrams(reference.lower().split(), n), _ngrams(candidate.lower().split(), n)
+    overlap = sum((ref & cand).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(cand.values()), overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+def rouge_l(reference, candidate):
+    ref, cand = reference.lower().split(), candidate.lower().split()
+    if not ref or not cand:
+        return 0.0
+    # Longest common subsequence, one row at a time
+    previous = [0] * (len(cand) + 1)
+    for r in ref:
+        current = [0]
+        for j, c in enumerate(cand):
+            current.append(previous[j] + 1 if r == c else max(previous[j + 1], current[j]))
+        previous = current
+    lcs = previous[-1]
+    if not lcs:
+        return 0.0
+    precision, recall = lcs / len(cand), lcs / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+def run_backend(task, backend, texts, language):
+    rss_before = psutil.Process().memory_info().rss
+    started = time.perf_counter()
+    if task == "summary":
+        model = Generate_summary.Generate_summary(backend = backend)
+        run = model.summury_generated
+    else:
+        model = Generate_summary.changelang(backend = backend)
+        run = lambda text: " ".join(model.translate_sentences(Generate_summary.split_sentences(text), language))
+    load_seconds = time.perf_counter() - started
+    rss_loaded = psutil.Process().memory_info().rss
+
+    run(texts[0])  # warm-up
+    outputs, latencies = [], []
+    for text in texts:
+        started = time.perf_counter()
+        outputs.append(run(text))
+        latencies.append(time.perf_counter() - started)
+
+    stats = {
+        "load_s" : load_seconds,
+        "mean_latency_s" : sum(latencies) / len(latencies),
+        "rss_delta_mb" : (rss_loaded - rss_before) / 2**20,
+        "weights_mb" : (model_footprint(model) or 0) / 2**20,
+    }
+    del model
+    gc.collect()
+    return outputs, stats
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--task", choices = ["summary", "translate"], default = "summary")
+    parser.add_argument("--backends", nargs = "+", default = ["fp32", "int8", "onnx"])
+    parser.add_argument("--language", default = "fra_Latn")
+    parser.add_argument("--max-rouge-drop", type = float, default = 0.05)
+    args = parser.parse_args()
+
+    files = sorted((ROOT / "test").glob("test*.txt"))
+    texts = preprocess.preprocess_many([f.read_text(encoding = "utf-8", errors = "replace") for f in files])
+
+    backends = ["fp32"] + [b for b in args.backends if b != "fp32"]
+    reference = None
+    failed = False
+    print(f"{'backend':<8}{'load s':>8}{'latency s':>11}{'RSS MB':>9}{'weights MB':>12}{'R-1':>7}{'R-2':>7}{'R-L':>7}")
+    for backend in backends:
+        try:
+            outputs, stats = run_backend(args.task, backend, texts, args.language)
+        except ImportError as e:
+            print(f"{backend:<8}skipped: {e}")
+            continue
+        if reference is None:
+            reference = outputs
+        scores = [
+            sum(metric(ref, out) for ref, out in zip(reference, outputs)) / len(outputs)
+            for metric in (lambda r, o: rouge_n(r, o, 1), lambda r, o: rouge_n(r, o, 2), rouge_l)
+        ]
+        print(f"{backend:<8}{stats['load_s']:>8.1f}{stats['mean_latency_s']:>11.2f}{stats['rss_delta_mb']:>9.0f}"
+              f"{stats['weights_mb']:>12.0f}{scores[0]:>7.3f}{scores[1]:>7.3f}{scores[2]:>7.3f}")
+        if 1.0 - scores[2] > args.max_rouge_drop:
+            failed = True
+
+    if failed:
+        print(f"ROUGE-L dropped by more than {args.max_rouge_drop} against fp32")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+LSTM summarizer decoding throughput: the old one-document greedy loop vs batched decoding.
+
+    python benchmarks/bench_decoding.py [--docs 64] [--batch-size 32] [--max-len 100]
+                                        [--beam-size 4] [--threads 0]
+
+Documents are random token ids of 200-800 tokens, decoded by a randomly initialised model
+with the model/infrenceloop.py sizes. A random model rarely says EOS, so every method runs
+the full --max-len steps. "loop" is the old generate_summary body (one document, argmax and
+.item() per token). "greedy" and "beam" are model/decoding.py on length-sorted padded batches.
+Batched greedy output is checked against the loop first.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import torch
+from torch.nn.utils.rnn import pad_sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from model.decoding import beam_search, greedy_decode  # noqa: E402
+from model.summurizer import PAD_ID, DecoderLSTM, Encoderlstm  # noqa: E402
+
+VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_SIZE = 2000, 128, 256
+BOS_ID, EOS_ID = 1, 2
+
+@torch.no_grad()
+def loop_decode(encoder, decoder, input_ids, max_len):
+    encoder_output, encoder_hidden = encoder(input_ids)
+    decoder_input = torch.tensor([[BOS_ID]])
+    decoder_hidden = encoder_hidden
+    summary_ids = []
+    for _ in range(max_len):
+        output, decoder_hidden = decoder(decoder_input, decoder_hidden, encoder_output)
+        next_token = output[:, -1, :].argmax(1).item()
+        if next_token == EOS_ID:
+            break
+        summary_ids.append(next_token)
+        decoder_input = torch.tensor([[next_token]])
+    return summary_ids
+
+def batches(docs, batch_size):
+    for start in range(0, len(docs), batch_size):
+        chunk = docs[start:start + batch_size]
+        yield pad_sequence(chunk, batch_first = True, padding_value = PAD_ID), torch.tensor([len(doc) for doc in chunk])
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type = int, default = 64)
+    parser.add_argument("--batch-size", type = int, default = 32)
+    parser.add_argument("--max-len", type = int, default = 100)
+    parser.add_argument("--beam-size", type = int, default = 4)
+    parser.add_argument("--threads", type = int, default = 0, help = "torch threads, default: torch's choice")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    torch.manual_seed(0)
+    encoder = Encoderlstm(VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_SIZE).eval()
+    decoder = DecoderLSTM(VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_SIZE).eval()
+    docs = [torch.randint(PAD_ID + 1, VOCAB_SIZE, (int(torch.randint(200, 800, ())),)) for _ in range(args.docs)]
+    # Batch neighbours by length so little of each batch is padding
+    docs.sort(key = len)
+
+    looped, loop_seconds = timed(lambda: [loop_decode(encoder, decoder, doc.unsqueeze(0), args.max_len) for doc in docs])
+    greedy, greedy_seconds = timed(lambda: [row for ids, lengths in batches(docs, args.batch_size)
+                                            for row in greedy_decode(encoder, decoder, ids, BOS_ID, EOS_ID,
+                                                                     max_len = args.max_len, lengths = lengths)])
+    mismatches = sum(a != b for a, b in zip(looped, greedy))
+    assert mismatches <= max(1, args.docs // 20), f"batched greedy differs from the loop on {mismatches} documents"
+    _, beam_seconds = timed(lambda: [row for ids, lengths in batches(docs, args.batch_size)
+                                     for row in beam_search(encoder, decoder, ids, BOS_ID, EOS_ID, beam_size = args.beam_size,
+                                                            max_len = args.max_len, lengths = lengths)])
+
+    print(f"{args.docs} documents, {args.max_len} tokens each, batch {args.batch_size}; "
+          f"greedy matches the loop on {args.docs - mismatches}/{args.docs}")
+    print(f"{'method':<12}{'total s':>10}{'docs/s':>10}{'speed-up':>10}")
+    for name, seconds in (("loop", loop_seconds), ("greedy", greedy_seconds), (f"beam x{args.beam_size}", beam_seconds)):
+        print(f"{name:<12}{seconds:>10.2f}{args.docs / seconds:>10.2f}{loop_seconds / seconds:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+LSTM summarizer training epoch: the original per-token training loop vs Trainer.train_step.
+
+    python benchmarks/bench_lstm_train.py [--batch-size 8] [--src-len 400] [--tgt-len 200]
+                                          [--batches 10] [--teacher-forcing-ratio 0.5] [--threads 0]
+
+"original" is benchmarks/lstm_reference.py: the pre-rewrite Trainer.train body on the
+pre-rewrite DecoderLSTM.forward (concatenated attention), one torch.rand per target token.
+"train_step" draws teacher forcing once per batch; forced batches go through
+DecoderLSTM.forward_sequence, the rest decode token by token on the cached encoder keys.
+Both train one epoch of --batches random batches at the same ratio, with the model sizes
+from model/infrenceloop.py. With full teacher forcing, loss and gradients are checked to
+match before anything is timed.
+
+forward_sequence keeps a per-token loop because each step's attention query is h_{t-1}.
+The last table prices that loop: a teacher-forced forward + backward through it vs one
+nn.LSTM call over the whole target with the context fixed at the first step's. That is
+a different (weaker) model and only a lower bound on what the loop could cost.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import torch
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import lstm_reference  # noqa: E402
+from model.summurizer import PAD_ID, Encoderlstm, DecoderLSTM, Trainer  # noqa: E402
+
+VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_SIZE = 2000, 128, 256
+
+def epoch_seconds(train_step, batches, teacher_forcing_ratio):
+    torch.manual_seed(1)
+    started = time.perf_counter()
+    for batch in batches:
+        train_step(batch, teacher_forcing_ratio)
+    return time.perf_counter() - started
+
+def gradients(encoder, decoder):
+    return [p.grad.clone() for p in list(encoder.parameters()) + list(decoder.parameters())]
+
+def backward(encoder, decoder, loss):
+    encoder.zero_grad()
+    decoder.zero_grad()
+    loss.backward()
+    return loss.item()
+
+def one_call_logits(decoder, input_ids, hidden_state, encoder_outputs):
+    # Not the model: every step attends with h_0, so nn.LSTM can run the whole target at once
+    context = decoder.attend(hidden_state[0][0], encoder_outputs, decoder.project_encoder(encoder_outputs))
+    embedded = decoder.embedding(input_ids)
+    lstm_input = torch.cat([embedded, context.unsqueeze(1).expand(-1, input_ids.size(1), -1)], dim = 2)
+    output, _ = decoder.lstm(lstm_input, hidden_state)
+    return decoder.output_projection(output)
+
+def median_seconds(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type = int, default = 8)
+    parser.add_argument("--src-len", type = int, default = 400)
+    parser.add_argument("--tgt-len", type = int, default = 200)
+    parser.add_argument("--batches", type = int, default = 10, help = "batches per epoch")
+    parser.add_argument("--teacher-forcing-ratio", type = float, default = 0.5, help = "Trainer.train's default")
+    parser.add_argument("--threads", type = int, default = 0, help = "torch threads, default: torch's choice")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    torch.manual_seed(0)
+    encoder = Encoderlstm(VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_SIZE)
+    decoder = DecoderLSTM(VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_SIZE)
+    optimizer = torch.optim.Adam(list(encoder.parameters()) + list(decoder.parameters()))
+    trainer = Trainer(encoder, decoder, optimizer, torch.nn.CrossEntropyLoss(ignore_index = PAD_ID), "cpu")
+    # Random ids above PAD_ID, so no token is padding and both losses average the same positions
+    batches = [{
+        "input_ids" : torch.randint(PAD_ID + 1, VOCAB_SIZE, (args.batch_size, args.src_len)),
+        "target_ids" : torch.randint(PAD_ID + 1, VOCAB_SIZE, (args.batch_size, args.tgt_len))
+    } for _ in range(args.batches)]
+    input_ids, target_ids = batches[0]["input_ids"], batches[0]["target_ids"]
+
+    # Same loss and gradients as the original code with full teacher forcing
+    encoder_outputs, encoder_hidden = encoder(input_ids)
+    old_loss = backward(encoder, decoder, lstm_reference.per_token_loss(
+        decoder, torch.nn.CrossEntropyLoss(), target_ids, encoder_hidden, encoder_outputs))
+    old_grads = gradients(encoder, decoder)
+    encoder_outputs, encoder_hidden = encoder(input_ids)
+    new_loss = backward(encoder, decoder, trainer.teacher_forced_loss(target_ids, encoder_hidden, encoder_outputs))
+    new_grads = gradients(encoder, decoder)
+    grad_diff = max((a - b).abs().max().item() for a, b in zip(old_grads, new_grads))
+    assert abs(old_loss - new_loss) < 1e-4 and grad_diff < 1e-4, (old_loss, new_loss, grad_diff)
+    print(f"loss {old_loss:.6f} vs {new_loss:.6f}, max gradient difference {grad_diff:.2e}")
+
+    # The loop in forward_sequence vs a single nn.LSTM call (see the module docstring)
+    def teacher_forced():
+        encoder_outputs, encoder_hidden = encoder(input_ids)
+        backward(encoder, decoder, trainer.teacher_forced_loss(target_ids, encoder_hidden, encoder_outputs))
+
+    def one_call():
+        encoder_outputs, encoder_hidden = encoder(input_ids)
+        logits = one_call_logits(decoder, target_ids[:, :-1], encoder_hidden, encoder_outputs)
+        backward(encoder, decoder, trainer.loss_fn(logits.reshape(-1, logits.size(-1)), target_ids[:, 1:].reshape(-1)))
+
+    loop_seconds, one_call_seconds = median_seconds(teacher_forced, 3), median_seconds(one_call, 3)
+    print(f"\nteacher-forced batch, forward + backward")
+    print(f"{'decoder':<20}{'s/batch':>10}")
+    print(f"{'forward_sequence':<20}{loop_seconds:>10.3f}")
+    print(f"{'one nn.LSTM call':<20}{one_call_seconds:>10.3f}")
+    print(f"the per-token loop costs {loop_seconds - one_call_seconds:.3f} s/batch "
+          f"({loop_seconds / one_call_seconds:.2f}x the one-call lower bound)")
+
+    reference_step = lambda batch, ratio: lstm_reference.train_step(
+        encoder, decoder, optimizer, torch.nn.CrossEntropyLoss(), batch, ratio)
+    rows = [
+        ("original", epoch_seconds(reference_step, batches, args.teacher_forcing_ratio)),
+        ("train_step", epoch_seconds(trainer.train_step, batches, args.teacher_forcing_ratio))
+    ]
+
+    tokens = args.batches * args.batch_size * (args.tgt_len - 1)
+    print(f"\none epoch of {args.batches} batches, teacher forcing ratio {args.teacher_forcing_ratio}")
+    print(f"{'method':<12}{'s/epoch':>10}{'target tok/s':>14}")
+    for name, seconds in rows:
+        print(f"{name:<12}{seconds:>10.2f}{tokens / seconds:>14.0f}")
+    print(f"speed-up: {rows[0][1] / rows[1][1]:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+PDF extraction throughput and time-to-first-page, before and after the page iterator.
+
+    python benchmarks/bench_pdf.py [--pages 400] [--workers 4] [--pages-per-task 16] [--repeat 3]
+                                   [--pdf some.pdf]
+
+Without --pdf a synthetic document of --pages text pages is generated with PyMuPDF.
+"pdfplumber" is the old default path (serial, whole document joined before returning),
+"mupdf serial" is Parser._parse_pdf_with_mupdf and "pages" is Parser.iter_pdf_pages on
+a process pool; for it the time until page 1 is available is reported as well.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from model.parser import Parser  # noqa: E402
+
+def synthetic_pdf(path, pages):
+    corpus = " ".join(f.read_text(encoding = "utf-8") for f in sorted((ROOT / "test").glob("test*.txt"))).split()
+    doc = fitz.open()
+    words_per_page = 450
+    for number in range(pages):
+        start = (number * words_per_page) % max(1, len(corpus) - words_per_page)
+        text = " ".join(corpus[start:start + words_per_page])
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 792), f"Page {number + 1}. {text}", fontsize = 9)
+    doc.save(path)
+    doc.close()
+
+def timed(repeat, fn):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def first_page(parser, path):
+    started = time.perf_counter()
+    pages = parser.iter_pdf_pages(path)
+    next(pages)
+    elapsed = time.perf_counter() - started
+    pages.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type = int, default = 400)
+    parser.add_argument("--workers", type = int, default = None, help = "default: all cores")
+    parser.add_argument("--pages-per-task", type = int, default = 16)
+    parser.add_argument("--repeat", type = int, default = 3)
+    parser.add_argument("--pdf", default = None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.pdf) if args.pdf else Path(tmp) / "synthetic.pdf"
+        if not args.pdf:
+            synthetic_pdf(path, args.pages)
+        with fitz.open(path) as doc:
+            page_count = len(doc)
+        print(f"{path.name}: {page_count} pages, {path.stat().st_size / 2**20:.1f} MB")
+
+        serial = Parser(pdf_workers = 1)
+        pooled = Parser(pdf_workers = args.workers, pages_per_task = args.pages_per_task)
+        list(pooled.iter_pdf_pages(path))  # start the pool outside the timings
+
+        # Same text either way
+        expected = serial._parse_pdf_with_mupdf(path)
+        assert pooled._parse_pdf_with_pages(path) == expected, "page iterator output differs from PyMuPDF"
+
+        rows = [
+            ("pdfplumber", timed(args.repeat, lambda: serial._parse_pdf_with_plumber(path)), None),
+            ("mupdf serial", timed(args.repeat, lambda: serial._parse_pdf_with_mupdf(path)), None),
+            (f"pages x{pooled.pdf_workers}", timed(args.repeat, lambda: pooled._parse_pdf_with_pages(path)),
+             statistics.median(first_page(pooled, path) for _ in range(args.repeat))),
+        ]
+        pooled.close()
+
+        print(f"{'method':<16}{'total s':>10}{'pages/s':>10}{'first page ms':>15}")
+        for name, seconds, first in rows:
+            first = f"{1000 * first:>15.1f}" if first is not None else f"{'-':>15}"
+            print(f"{name:<16}{seconds:>10.2f}{page_count / seconds:>10.0f}{first}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Per-MB cost of text preprocessing, before and after the PreprocessEngine.
+
+    python benchmarks/bench_preprocess.py [--model en_core_web_sm] [--repeat 3]
+
+"before" is the old preprocess_text (spaCy loaded on every call, one re.sub per rule),
+"after" is PreprocessEngine.preprocess on a single document and preprocess_many over
+the whole corpus.
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+import spacy
+import contractions
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from utils.preprocess import PreprocessEngine  # noqa: E402
+
+def legacy_preprocess_text(text, model):
+    # Copy of backend/utils/preprocess.py before the engine was introduced
+    nlp = spacy.load(model)
+    text = re.sub(r"http\S+|www\S+|watch.*?»", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"Copyright.*?reserved\.", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"This material.*?redistributed", "", text, flags=re.IGNORECASE)
+    text = text.replace("’", "'").replace("‘", "'")
+    text = text.replace("“", '"').replace("”", '"')
+    text = re.sub(r"\s+", " ", text).strip()
+    text = re.sub(r"\bi\b", "I", text)
+    text = re.sub(r"E-mail to a friend\s*\.*", "", text, flags=re.IGNORECASE)
+    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+    text = re.sub(r"\.\.+", ".", text)
+    text = re.sub(r"\b\w\b", "", text)
+    text = contractions.fix(text)
+    doc = nlp(text)
+    sentences = [sent.text.strip().capitalize() for sent in doc.sents if sent.text.strip()]
+    return " ".join(sentences)
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default = "en_core_web_sm")
+    parser.add_argument("--repeat", type = int, default = 3)
+    args = parser.parse_args()
+
+    files = sorted((ROOT / "test").glob("test*.txt"))
+    texts = [f.read_text(encoding = "utf-8", errors = "replace") for f in files]
+
+    engine = PreprocessEngine(args.model)
+
+    print(f"{'file':<12}{'KB':>8}{'before ms/MB':>16}{'after ms/MB':>16}{'speedup':>10}")
+    total_before = total_after = 0.0
+    for f, text in zip(files, texts):
+        mb = len(text.encode("utf-8")) / 2**20
+        before = best_of(args.repeat, lambda: legacy_preprocess_text(text, args.model))
+        after = best_of(args.repeat, lambda: engine.preprocess(text))
+        total_before += before
+        total_after += after
+        print(f"{f.name:<12}{mb * 1024:>8.1f}{1000 * before / mb:>16.1f}{1000 * after / mb:>16.1f}{before / after:>9.1f}x")
+
+    corpus_mb = sum(len(t.encode("utf-8")) for t in texts) / 2**20
+    batched = best_of(args.repeat, lambda: engine.preprocess_many(texts))
+    print()
+    print(f"corpus {corpus_mb * 1024:.1f} KB")
+    print(f"  before, one call per file   : {1000 * total_before / corpus_mb:10.1f} ms/MB")
+    print(f"  after,  one call per file   : {1000 * total_after / corpus_mb:10.1f} ms/MB")
+    print(f"  after,  preprocess_many     : {1000 * batched / corpus_mb:10.1f} ms/MB")
+
+if __name__ == "__main__":
+    main()
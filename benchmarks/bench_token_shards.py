@@ -0,0 +1,77 @@
+"""
+Tokenized corpus load time and memory: token lists in csv vs memory-mapped shards.
+
+    python benchmarks/bench_token_shards.py [--rows 20000] [--input-len 2500] [--target-len 250]
+
+Random token ids with lengths up to --input-len / --target-len are written both ways.
+"csv" is the old path (pandas + parsing every list, here through TokenDataset), "shards"
+is ShardDataset over model/token_shards.py. Each load runs in a fresh process; memory is
+the peak RSS growth during the load, after torch/pandas are imported.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+LOAD = """
+import resource, sys, time
+sys.path.insert(0, {root!r})
+from model.summurizer import ShardDataset, TokenDataset
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+ds = TokenDataset.from_csv({csv!r}) if {kind!r} == "csv" else ShardDataset({shards!r})
+total = sum(int(a) + int(b) for a, b in ds.lengths)
+print(time.perf_counter() - started, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024, total)
+"""
+
+def write_corpus(directory, rows, input_len, target_len):
+    import pandas as pd
+    rng = np.random.default_rng(0)
+    inputs = [rng.integers(1, 10000, rng.integers(10, input_len)) for _ in range(rows)]
+    targets = [rng.integers(1, 10000, rng.integers(5, target_len)) for _ in range(rows)]
+
+    csv = directory / "tokens.csv"
+    pd.DataFrame({
+        "text_tokens": [str(row.tolist()) for row in inputs],
+        "abstract_tokens": [str(row.tolist()) for row in targets]
+    }).to_csv(csv, index=False)
+
+    # Same layout write_shards produces, without needing a SentencePiece model
+    shards = directory / "tokens"
+    shards.mkdir()
+    for name, column in (("text_tokens", inputs), ("abstract_tokens", targets)):
+        np.concatenate(column).astype(np.uint16).tofile(shards / f"{name}-00000.bin")
+        np.save(shards / f"{name}-00000.idx.npy", np.cumsum([0] + [len(row) for row in column]).astype(np.int64))
+    meta = {"columns": ["text_tokens", "abstract_tokens"], "dtype": "uint16", "vocab_size": 10000,
+            "rows": rows, "shards": [{"index": 0, "rows": rows}]}
+    (shards / "meta.json").write_text(json.dumps(meta))
+    return csv, shards
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type = int, default = 20000)
+    parser.add_argument("--input-len", type = int, default = 2500)
+    parser.add_argument("--target-len", type = int, default = 250)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv, shards = write_corpus(Path(tmp), args.rows, args.input_len, args.target_len)
+        shard_bytes = sum(f.stat().st_size for f in shards.iterdir())
+        print(f"{args.rows} rows: csv {csv.stat().st_size / 2**20:.0f} MB, shards {shard_bytes / 2**20:.0f} MB")
+
+        print(f"{'format':<8}{'load s':>10}{'+RSS MB':>14}{'tokens':>14}")
+        for kind in ("csv", "shards"):
+            code = LOAD.format(root = str(ROOT), csv = str(csv), shards = str(shards), kind = kind)
+            seconds, rss, tokens = subprocess.run([sys.executable, "-c", code], capture_output = True, text = True,
+                                                  check = True).stdout.split()
+            print(f"{kind:<8}{float(seconds):>10.2f}{float(rss):>14.0f}{int(tokens):>14}")
+
+if __name__ == "__main__":
+    main()
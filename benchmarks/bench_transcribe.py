@@ -0,0 +1,99 @@
+"""
+Long-recording transcription: one serial Whisper pass vs VAD segments on a worker pool.
+
+    python benchmarks/bench_transcribe.py [--minutes 60] [--workers 4] [--model openai/whisper-tiny]
+                                          [--stand-in]
+
+The input is test/harvard.wav repeated to --minutes. "serial" is the old frontend
+behaviour: one model walking the recording in consecutive 30 s windows. "vad pool" is
+utils.transcribe.Transcriber: energy VAD, segments packed up to 30 s and transcribed on
+--workers processes. --stand-in swaps Whisper for a tiny random model so the benchmark
+runs offline; it then measures scheduling and VAD overhead, not real model cost.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from utils import transcribe  # noqa: E402
+
+class StandInTokenizer():
+    def batch_decode(self, ids, skip_special_tokens = True):
+        return [" ".join(str(i) for i in row.tolist()) for row in ids]
+
+def load_stand_in(model_name):
+    from transformers import WhisperConfig, WhisperFeatureExtractor, WhisperForConditionalGeneration
+    torch.manual_seed(0)
+    model = WhisperForConditionalGeneration(WhisperConfig(
+        vocab_size = 1000, d_model = 64, encoder_layers = 2, decoder_layers = 2,
+        encoder_attention_heads = 4, decoder_attention_heads = 4,
+        encoder_ffn_dim = 128, decoder_ffn_dim = 128, max_target_positions = 128,
+        decoder_start_token_id = 1, pad_token_id = 0, eos_token_id = 2, begin_suppress_tokens = None,
+        suppress_tokens = None
+    )).eval()
+    model.generation_config.max_length = 32
+    return WhisperFeatureExtractor(), StandInTokenizer(), model
+
+def serial(audio, loader, model_name):
+    feature_extractor, tokenizer, model = loader(model_name)
+    window = transcribe.MAX_SEGMENT_SECONDS * transcribe.SAMPLE_RATE
+    texts = []
+    for start in range(0, len(audio), window):
+        features = feature_extractor(audio[start:start + window], sampling_rate = transcribe.SAMPLE_RATE,
+                                     return_tensors = "pt").input_features
+        with torch.inference_mode():
+            ids = model.generate(features)
+        texts.append(tokenizer.batch_decode(ids, skip_special_tokens = True)[0])
+    return texts
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type = float, default = 60)
+    parser.add_argument("--workers", type = int, default = 4)
+    parser.add_argument("--model", default = "openai/whisper-tiny")
+    parser.add_argument("--stand-in", action = "store_true")
+    args = parser.parse_args()
+    loader = load_stand_in if args.stand_in else transcribe.load_whisper
+
+    clip = transcribe.decode_audio((ROOT / "test" / "harvard.wav" / "harvard.wav").read_bytes())
+    repeats = max(1, int(args.minutes * 60 * transcribe.SAMPLE_RATE // len(clip)))
+    audio = np.tile(clip, repeats)
+    seconds = len(audio) / transcribe.SAMPLE_RATE
+    print(f"audio: {seconds / 60:.1f} min ({repeats} x harvard.wav)")
+
+    started = time.perf_counter()
+    segments = transcribe.detect_speech(audio)
+    vad_seconds = time.perf_counter() - started
+    print(f"vad: {len(segments)} segments in {vad_seconds:.2f} s, "
+          f"{sum(end - start for start, end in segments) / len(audio):.0%} of the audio kept")
+
+    started = time.perf_counter()
+    windows = serial(audio, loader, args.model)
+    serial_seconds = time.perf_counter() - started
+
+    transcriber = transcribe.Transcriber(args.model, max_workers = args.workers, loader = loader)
+    # Pay process start-up and model loading outside the timing
+    list(transcriber.transcribe(clip))
+    started = time.perf_counter()
+    first = None
+    results = []
+    for segment in transcriber.transcribe(audio):
+        if first is None:
+            first = time.perf_counter() - started
+        results.append(segment)
+    pool_seconds = time.perf_counter() - started
+    transcriber.close()
+
+    print(f"{'method':<12}{'windows':>9}{'total s':>10}{'x realtime':>12}{'first text s':>14}")
+    print(f"{'serial':<12}{len(windows):>9}{serial_seconds:>10.1f}{seconds / serial_seconds:>12.1f}{serial_seconds:>14.1f}")
+    print(f"{'vad pool':<12}{len(results):>9}{pool_seconds:>10.1f}{seconds / pool_seconds:>12.1f}{first:>14.1f}")
+    print(f"speed-up: {serial_seconds / pool_seconds:.2f}x with {args.workers} workers")
+
+if __name__ == "__main__":
+    main()
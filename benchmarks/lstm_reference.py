@@ -0,0 +1,51 @@
+"""
+The LSTM summarizer as it was before the training/decoding rewrites, kept verbatim as the
+baseline the benchmarks (and tests/) measure against. Functions take the current modules:
+the parameters are the same, only the computation is the original one.
+"""
+import torch
+
+def attention_context(decoder, hidden_state, encoder_outputs):
+    # Original attention: over cat([h expanded to src_len, encoder_outputs]), (batch_size, 1, hidden_size)
+    src_len = encoder_outputs.size(1)
+    decoder_hidden = hidden_state[0].transpose(0, 1)
+    decoder_hidden_expanded = decoder_hidden.expand(-1, src_len, -1)
+    combined = torch.cat([decoder_hidden_expanded, encoder_outputs], dim = 2)
+    energy = torch.tanh(decoder.attention(combined))
+    attention_weights = torch.softmax(energy.sum(dim = 2), dim = 1)
+    context = torch.bmm(attention_weights.unsqueeze(1), encoder_outputs)
+    return decoder.context_projection(context)
+
+def decoder_step(decoder, input_token, hidden_state, encoder_outputs):
+    # Original DecoderLSTM.forward
+    embedded = decoder.embedding(input_token)
+    context = attention_context(decoder, hidden_state, encoder_outputs)
+    lstm_input = torch.cat([embedded, context], dim = 2)
+    output, new_hidden = decoder.lstm(lstm_input, hidden_state)
+    return decoder.output_projection(output), new_hidden
+
+def per_token_loss(decoder, loss_fn, target_ids, encoder_hidden, encoder_outputs, teacher_forcing_ratio = 1.0):
+    # Original Trainer.train inner loop: one step, one loss and one torch.rand per target token
+    decoder_hidden = encoder_hidden
+    decoder_input = target_ids[:, 0:1]
+    total_loss_batch = 0
+    tgt_len = target_ids.size(1)
+    for t in range(1, tgt_len):
+        decoder_output, decoder_hidden = decoder_step(decoder, decoder_input, decoder_hidden, encoder_outputs)
+        logits = decoder_output.squeeze(1)
+        total_loss_batch += loss_fn(logits, target_ids[:, t])
+        if torch.rand(1).item() < teacher_forcing_ratio:
+            decoder_input = target_ids[:, t:t+1]
+        else:
+            decoder_input = logits.argmax(dim = 1, keepdim = True)
+    return total_loss_batch / (tgt_len - 1)
+
+def train_step(encoder, decoder, optimizer, loss_fn, batch, teacher_forcing_ratio):
+    # Original Trainer.train body for one batch
+    encoder_outputs, encoder_hidden = encoder(batch["input_ids"])
+    loss = per_token_loss(decoder, loss_fn, batch["target_ids"], encoder_hidden, encoder_outputs, teacher_forcing_ratio)
+    optimizer.zero_grad()
+    loss.backward()
+    torch.nn.utils.clip_grad_norm_(list(encoder.parameters()) + list(decoder.parameters()), max_norm = 1.0)
+    optimizer.step()
+    return loss.item()
@@ -0,0 +1,233 @@
+"""
+Per-stage micro-benchmarks for the summarization pipeline.
+
+    python benchmarks/run_pipeline.py [--repeat 5] [--sizes 1KB 10KB 100KB 1MB 10MB]
+                                      [--output results.json]
+                                      [--baseline benchmarks/baseline.json] [--tolerance 0.25]
+                                      [--save-baseline] [--require-baseline]
+
+Stages timed separately:
+    parse        model/parser.Parser.parse_file
+    preprocess   backend/utils/preprocess.PreprocessEngine.preprocess
+    tokenize     the tokenizer call made by Generate_summary.summury_generated_batch
+    generate     model.generate with Generate_summary.generation_kwargs
+    decode       tokenizer.batch_decode
+    audio_*      wav decode, 16 kHz resample, log-mel features and Whisper generate
+
+Inputs are test/test1-5.txt, test/harvard.wav and synthetic text scaled to --sizes.
+Everything runs offline: the models are tiny randomly initialized LongT5/Whisper
+stand-ins, the tokenizer is prototype/bpe.model and spaCy is a blank English
+pipeline with a sentencizer, so the numbers measure pipeline overhead rather than
+real model cost. Results are written as JSON; with --baseline each stage is
+compared against the stored run and the script exits non-zero when any stage is
+slower than baseline * (1 + tolerance). The committed benchmarks/baseline.json
+comes from a 1-core Linux box; re-save it with --save-baseline on the machine
+that runs the check. A missing baseline is reported, and is an error with
+--require-baseline.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+import spacy
+import torch
+from transformers import (LongT5Config, LongT5ForConditionalGeneration, T5Tokenizer,
+                          WhisperConfig, WhisperFeatureExtractor, WhisperForConditionalGeneration)
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "backend"))
+
+from model.parser import Parser  # noqa: E402
+from utils import Generate_summary  # noqa: E402
+from utils.preprocess import PreprocessEngine  # noqa: E402
+
+SIZE_UNITS = {"KB" : 2**10, "MB" : 2**20}
+
+def parse_size(label):
+    return int(float(label[:-2]) * SIZE_UNITS[label[-2:].upper()])
+
+def timed(repeat, fn):
+    fn()  # warm-up, not recorded
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {
+        "min_s" : min(samples),
+        "median_s" : statistics.median(samples),
+        "mean_s" : statistics.fmean(samples),
+        "repeat" : repeat,
+    }
+
+def stand_in_summary(max_length):
+    """Generate_summary with a tiny random LongT5 and the prototype SentencePiece model"""
+    summary = Generate_summary.Generate_summary.__new__(Generate_summary.Generate_summary)
+    summary.model_name = "stand-in/long-t5-tiny"
+    summary.backend = "fp32"
+    summary.device = torch.device("cpu")
+    summary.max_input_length = 4096
+    summary.generation_kwargs = {"max_length" : max_length, "num_beams" : 4, "early_stopping" : True}
+    summary.tokenizer = T5Tokenizer(str(ROOT / "prototype" / "bpe.model"), legacy = True)
+    torch.manual_seed(0)
+    summary.model = LongT5ForConditionalGeneration(LongT5Config(
+        vocab_size = len(summary.tokenizer), d_model = 64, d_ff = 128, d_kv = 16,
+        num_layers = 2, num_heads = 4, decoder_start_token_id = summary.tokenizer.pad_token_id,
+        pad_token_id = summary.tokenizer.pad_token_id, eos_token_id = summary.tokenizer.eos_token_id
+    )).eval()
+    return summary
+
+def stand_in_whisper():
+    torch.manual_seed(0)
+    return WhisperForConditionalGeneration(WhisperConfig(
+        vocab_size = 1000, d_model = 64, encoder_layers = 2, decoder_layers = 2,
+        encoder_attention_heads = 4, decoder_attention_heads = 4,
+        encoder_ffn_dim = 128, decoder_ffn_dim = 128, max_target_positions = 128,
+        decoder_start_token_id = 1, pad_token_id = 0, eos_token_id = 2, begin_suppress_tokens = None,
+        suppress_tokens = None
+    )).eval()
+
+def read_wav(path):
+    with wave.open(str(path)) as w:
+        channels, rate = w.getnchannels(), w.getframerate()
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype = np.int16)
+    return pcm.reshape(-1, channels).mean(axis = 1).astype(np.float32) / 32768.0, rate
+
+def resample(audio, rate, target = 16000):
+    positions = np.arange(0, len(audio), rate / target)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+def synthetic_text(corpus, size):
+    text = "\n\n".join(corpus)
+    return (text * (size // len(text) + 1))[:size]
+
+def text_benchmarks(args, results, label, path, text, summary, engine, parser, generate = True):
+    size = len(text.encode("utf-8"))
+
+    def record(stage, stats):
+        results.append({"stage" : stage, "input" : label, "bytes" : size, **stats})
+        print(f"  {stage:<16}{label:<14}{size / 1024:>10.1f} KB{1000 * stats['median_s']:>12.2f} ms")
+
+    record("parse", timed(args.repeat, lambda: parser.parse_file(path)))
+    record("preprocess", timed(args.repeat, lambda: engine.preprocess(text)))
+    if not generate:
+        return
+
+    clean = engine.preprocess(text)
+    prompt = ["summarize: " + clean]
+    tokenize = lambda: summary.tokenizer(prompt, return_tensors = "pt", max_length = summary.max_input_length,
+                                         truncation = True, padding = True)
+    record("tokenize", timed(args.repeat, tokenize))
+    inputs = tokenize()
+    with torch.inference_mode():
+        record("generate", timed(args.repeat, lambda: summary.model.generate(**inputs, **summary.generation_kwargs)))
+        ids = summary.model.generate(**inputs, **summary.generation_kwargs)
+    record("decode", timed(args.repeat, lambda: summary.tokenizer.batch_decode(ids, skip_special_tokens = True)))
+
+def audio_benchmarks(args, results, path):
+    extractor = WhisperFeatureExtractor()
+    whisper = stand_in_whisper()
+    size = path.stat().st_size
+
+    def record(stage, stats):
+        results.append({"stage" : stage, "input" : path.name, "bytes" : size, **stats})
+        print(f"  {stage:<16}{path.name:<14}{size / 1024:>10.1f} KB{1000 * stats['median_s']:>12.2f} ms")
+
+    record("audio_load", timed(args.repeat, lambda: read_wav(path)))
+    audio, rate = read_wav(path)
+    record("audio_resample", timed(args.repeat, lambda: resample(audio, rate)))
+    audio = resample(audio, rate)
+    features = lambda: extractor(audio[:30 * 16000], sampling_rate = 16000, return_tensors = "pt").input_features
+    record("audio_features", timed(args.repeat, features))
+    input_features = features()
+    with torch.inference_mode():
+        record("audio_generate", timed(args.repeat, lambda: whisper.generate(input_features, max_length = args.max_length)))
+
+def compare(results, baseline, tolerance):
+    base = {(r["stage"], r["input"]) : r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'stage':<16}{'input':<14}{'baseline ms':>13}{'now ms':>10}{'change':>9}")
+    for r in results:
+        b = base.get((r["stage"], r["input"]))
+        if b is None:
+            continue
+        change = r["median_s"] / b["median_s"] - 1
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{r['stage']:<16}{r['input']:<14}{1000 * b['median_s']:>13.2f}{1000 * r['median_s']:>10.2f}{change:>+9.0%}{flag}")
+        if flag:
+            regressions.append(r)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type = int, default = 5)
+    parser.add_argument("--sizes", nargs = "*", default = ["1KB", "10KB", "100KB", "1MB", "10MB"])
+    parser.add_argument("--max-length", type = int, default = 32, help = "generated tokens for the stand-in models")
+    parser.add_argument("--output", default = "benchmark_results.json")
+    parser.add_argument("--baseline", default = str(ROOT / "benchmarks" / "baseline.json"))
+    parser.add_argument("--tolerance", type = float, default = 0.25)
+    parser.add_argument("--save-baseline", action = "store_true", help = "write this run to --baseline")
+    parser.add_argument("--require-baseline", action = "store_true", help = "exit non-zero when --baseline is missing")
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)  # steadier numbers; the stand-ins are too small to scale anyway
+    summary = stand_in_summary(args.max_length)
+    file_parser = Parser()
+    with tempfile.TemporaryDirectory() as tmp:
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        nlp.to_disk(Path(tmp) / "spacy")
+        engine = PreprocessEngine(str(Path(tmp) / "spacy"))
+
+        results = []
+        corpus_files = sorted((ROOT / "test").glob("test*.txt"))
+        corpus = [f.read_text(encoding = "utf-8") for f in corpus_files]
+
+        print("corpus")
+        for path, text in zip(corpus_files, corpus):
+            text_benchmarks(args, results, path.name, path, text, summary, engine, file_parser)
+
+        print("synthetic")
+        for label in args.sizes:
+            path = Path(tmp) / f"synthetic_{label}.txt"
+            text = synthetic_text(corpus, parse_size(label))
+            path.write_text(text, encoding = "utf-8")
+            # Past the 4096 token window tokenize/generate/decode no longer change with size
+            text_benchmarks(args, results, f"synthetic_{label}", path, text, summary, engine, file_parser,
+                            generate = parse_size(label) <= 2**20)
+
+        print("audio")
+        audio_benchmarks(args, results, ROOT / "test" / "harvard.wav" / "harvard.wav")
+
+    run = {
+        "created" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine" : {"python" : platform.python_version(), "torch" : torch.__version__, "platform" : platform.platform()},
+        "results" : results,
+    }
+    Path(args.output).write_text(json.dumps(run, indent = 2))
+    print(f"\nresults written to {args.output}")
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(run, indent = 2))
+        print(f"baseline written to {args.baseline}")
+    elif Path(args.baseline).exists():
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+    else:
+        print(f"\nWARNING: no baseline at {args.baseline}, regression check skipped "
+              f"(create one with --save-baseline)", file = sys.stderr)
+        if args.require_baseline:
+            sys.exit(2)
+
+if __name__ == "__main__":
+    main()
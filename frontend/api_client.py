@@ -0,0 +1,162 @@
+import gzip
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# API Configuration
+API = os.getenv("SUMMARIZER_API", "http://161.118.190.255:8000")
+CONNECT_TIMEOUT = float(os.getenv("SUMMARIZER_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("SUMMARIZER_READ_TIMEOUT", 300))  # longest gap between two streamed events
+GZIP_MIN_BYTES = 1024
+CACHE_ENTRIES = int(os.getenv("SUMMARIZER_CACHE_ENTRIES", 256))
+CACHE_TTL = int(os.getenv("SUMMARIZER_CACHE_TTL", 6 * 60 * 60))
+
+@st.cache_resource
+def session():
+    """One keep-alive connection pool shared by every Streamlit session"""
+    # POSTs aren't idempotent, so past connect errors they are only retried on 503:
+    # the backend sends it (with Retry-After) while models load, before anything runs
+    # or is written. post() always sends bytes, so a retry replays the whole body.
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=0,  # a summary may already be running server side
+        status=2,
+        status_forcelist=(503,),
+        allowed_methods=frozenset({"GET", "POST"}),
+        backoff_factor=0.5,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    s = requests.Session()
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update({"Accept-Encoding" : "gzip"})
+    return s
+
+def post(path, payload=None, data=None, stream=False, params=None, content_type=None):
+    """POST JSON or a raw body; JSON and text bodies are gzipped when it is worth it"""
+    headers = {}
+    if payload is not None:
+        data = json.dumps(payload).encode()
+        content_type = "application/json"
+    if content_type:
+        headers["Content-Type"] = content_type
+    if hasattr(data, "read"):
+        # A file object is used up by the first attempt; bytes can be sent again
+        data = data.read()
+    compressible = content_type and (content_type == "application/json" or content_type.startswith("text/"))
+    if compressible and len(data) >= GZIP_MIN_BYTES:
+        data = gzip.compress(data, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    res = session().post(f"{API}{path}", data=data, headers=headers, params=params, stream=stream,
+                         timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    res.raise_for_status()
+    return res
+
+# Server-sent events from the streaming endpoints
+def stream_events(path, **request):
+    """Yield (event, data) pairs from a text/event-stream response; `request` goes to post()"""
+    with post(path, stream=True, **request) as res:
+        event = "message"
+        for line in res.iter_lines(decode_unicode=True):
+            if not line:
+                event = "message"
+            elif line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):])
+
+def stream_into(placeholder, path, **request):
+    """Render fragments into the placeholder as they arrive, return the final `done` payload"""
+    text = ""
+    result = {}
+    for event, fragment in stream_events(path, **request):
+        if event == "done":
+            result = fragment
+            break
+        if event == "error":
+            placeholder.empty()
+            raise RuntimeError(fragment.get("detail", "request failed"))
+        text += fragment["text"]
+        placeholder.markdown(f"📝 {text}▌")
+    placeholder.empty()
+    return result
+
+# Results shared across sessions, keyed by the file hash (and language). Only finished
+# results go in: st.cache_data would replay the placeholder calls made while streaming,
+# which fails for a placeholder created outside the cached function.
+class ResultCache():
+    """LRU of finished results with a time-to-live, safe to share between sessions"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+@st.cache_resource
+def results():
+    return ResultCache(CACHE_ENTRIES, CACHE_TTL)
+
+# Failures raise, so they are never cached
+def summarize_text(file_hash, file_name, file_content, placeholder):
+    """Upload, summarize and save in one call, shown while it streams in"""
+    key = ("summary", file_hash)
+    result = results().get(key)
+    if result is None:
+        # Sent as a raw (gzipped) body, which the backend writes to GridFS as it arrives
+        result = stream_into(placeholder, "/api/summarize/upload/stream", data=file_content.encode("utf-8"),
+                             params={"file_name" : file_name}, content_type="text/plain; charset=utf-8")
+        if not result.get("summary"):
+            raise RuntimeError("no summary was returned")
+        results().set(key, result)
+    return result
+
+def summarize_audio(file_hash, file_name, audio_file, placeholder):
+    """Transcribe on the backend, then summarize and save the transcript"""
+    key = ("summary", file_hash)
+    result = results().get(key)
+    if result is None:
+        transcript = stream_into(placeholder, "/api/transcribe/stream", data=audio_file.getvalue())
+        result = summarize_text(f"{file_hash}:transcript", file_name, transcript.get("text", ""), placeholder)
+        results().set(key, result)
+    return result
+
+def translate(file_hash, language, file_id, placeholder):
+    key = ("translation", file_hash, language)
+    summary = results().get(key)
+    if summary is None:
+        summary = stream_into(placeholder, "/api/changelanguage/stream", payload={
+            "id" : file_id,
+            "language" : language
+        }).get("summary")
+        if not summary:
+            raise RuntimeError("no translation was returned")
+        results().set(key, summary)
+    return summary
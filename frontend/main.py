@@ -1,9 +1,6 @@
 import streamlit as st
 import hashlib
-import requests
-import whisper
-from pydub import AudioSegment
-import tempfile
+import api_client
 
 # Page configuration
 st.set_page_config(
@@ -13,9 +10,6 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# API Configuration
-API = "http://161.118.190.255:8000"
-
 # Language mapping
 lang_map = {
     "English": None,
@@ -167,11 +161,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load Whisper model for audio processing
-@st.cache_resource
-def load_whisper_model():
-    return whisper.load_model("tiny")
-
 # Text file handler
 def handle_text_file(file):
     """Handle text/PDF file processing"""
@@ -185,53 +174,27 @@ def handle_text_file(file):
             if st.button("🚀 Generate Summary", use_container_width=True, type="primary"):
                 with st.spinner("Processing your document..."):
                     try:
-                        # Upload file to API
-                        res = requests.post(f"{API}/api/upload", json={
-                            "file_name": file_name,
-                            "file_content": file_content
-                        })
+                        # Shared cache first, so a file seen before (in any session) isn't summarized again
+                        result = api_client.summarize_text(file_hash, file_name, file_content, st.empty())
                         
-                        if res.status_code == 200:
-                            st.session_state["file_id"] = res.json()["file_id"]
+                        if result.get("summary"):
+                            st.session_state["file_id"] = result["file_id"]
                             st.session_state["file_hash"] = file_hash
-                            
-                            # Generate summary
-                            res = requests.post(f"{API}/api/Generatetext", json={
-                                "file_id": st.session_state["file_id"]
-                            })
-                            
-                            if res.status_code == 200:
-                                summary = res.json().get("summary", "")
-                                
-                                # Upload summary
-                                req = requests.post(f"{API}/api/upload_summury", json={
-                                    "id": st.session_state["file_id"],
-                                    "file_content": summary,
-                                })
-                                
-                                if req.status_code == 200:
-                                    st.session_state["summary"] = summary
-                                    st.session_state["current_step"] = 4
-                                    st.success("✅ Summary generated successfully!")
-                                    st.rerun()
-                                else:
-                                    st.error("❌ Failed to save summary. Please try again.")
-                            else:
-                                st.error("❌ Failed to generate summary. Please try again.")
+                            st.session_state["summary"] = result["summary"]
+                            st.session_state["current_step"] = 4
+                            st.success("✅ Summary generated successfully!")
+                            st.rerun()
                         else:
-                            st.error("❌ Couldn't upload file. Please try again.")
+                            st.error("❌ Failed to generate summary. Please try again.")
                     except Exception as e:
                         st.error(f"❌ Error: {str(e)}")
 
 # Audio file handler
 def handle_audio_file(audio_file):
     """Handle audio file processing"""
-    model = load_whisper_model()
-    
     if audio_file is not None:
-        sound = AudioSegment.from_file(audio_file)
-        raw_data = sound.raw_data
-        file_hash = hashlib.md5(raw_data).hexdigest()
+        # Hash the upload as it is; decoding happens once, on the backend
+        file_hash = hashlib.md5(audio_file.getbuffer()).hexdigest()
 
         if ("file_hash" not in st.session_state) or (st.session_state["file_hash"] != file_hash):
             col1, col2, col3 = st.columns([1, 2, 1])
@@ -239,50 +202,18 @@ def handle_audio_file(audio_file):
                 if st.button("🚀 Transcribe & Summarize", use_container_width=True, type="primary"):
                     with st.spinner("Transcribing audio and generating summary..."):
                         try:
-                            # Save to temporary file for Whisper
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-                                temp_path = tmp_file.name
-                                sound.set_frame_rate(16000).set_channels(1).export(temp_path, format="wav")
-
-                            # Transcribe audio
-                            result = model.transcribe(temp_path)
-                            text = result["text"]
-                            
-                            # Upload transcribed text
-                            res = requests.post(f"{API}/api/upload", json={
-                                "file_name": audio_file.name,
-                                "file_content": text
-                            })
+                            # Transcribe and summarize on the backend, shown as it streams in
+                            result = api_client.summarize_audio(file_hash, audio_file.name, audio_file, st.empty())
 
-                            if res.status_code == 200:
-                                st.session_state["file_id"] = res.json()["file_id"]
+                            if result.get("summary"):
+                                st.session_state["file_id"] = result["file_id"]
                                 st.session_state["file_hash"] = file_hash
-                                
-                                # Generate summary
-                                res = requests.post(f"{API}/api/Generatetext", json={
-                                    "file_id": st.session_state["file_id"]
-                                })
-                                
-                                if res.status_code == 200:
-                                    summary = res.json().get("summary", "")
-                                    
-                                    # Upload summary
-                                    req = requests.post(f"{API}/api/upload_summury", json={
-                                        "id": st.session_state["file_id"],
-                                        "file_content": summary,
-                                    })
-                                    
-                                    if req.status_code == 200:
-                                        st.session_state["summary"] = summary
-                                        st.session_state["current_step"] = 4
-                                        st.success("✅ Audio transcribed and summarized successfully!")
-                                        st.rerun()
-                                    else:
-                                        st.error("❌ Failed to save summary.")
-                                else:
-                                    st.error("❌ Failed to generate summary.")
+                                st.session_state["summary"] = result["summary"]
+                                st.session_state["current_step"] = 4
+                                st.success("✅ Audio transcribed and summarized successfully!")
+                                st.rerun()
                             else:
-                                st.error("❌ Couldn't process audio file. Please try again.")
+                                st.error("❌ Failed to generate summary.")
                         except Exception as e:
                             st.error(f"❌ Error: {str(e)}")
 
@@ -367,8 +298,7 @@ else:
         key="audio_uploader"
     )
     if audio_file:
-        file_size = len(audio_file.read()) / (1024 * 1024)
-        audio_file.seek(0)
+        file_size = audio_file.size / (1024 * 1024)
         st.markdown(f"""
         <div class="status-card status-success">
             <strong>✅ Audio file uploaded successfully!</strong><br>
@@ -399,13 +329,14 @@ if "summary" in st.session_state and "file_hash" in st.session_state:
             if selected_lang:
                 with st.spinner(f"Translating to {selected_lang}..."):
                     try:
-                        res = requests.post(f"{API}/api/changelanguage", json={
-                            "id": st.session_state["file_id"],
-                            "language": lang_map[selected_lang]
-                        })
+                        translated_summary = api_client.translate(
+                            st.session_state["file_hash"],
+                            lang_map[selected_lang],
+                            st.session_state["file_id"],
+                            st.empty()
+                        )
                         
-                        if res.status_code == 200:
-                            translated_summary = res.json().get("summary", "")
+                        if translated_summary:
                             st.session_state["summary"] = translated_summary
                             st.session_state["selected_lang"] = selected_lang
                             st.success(f"✅ Summary translated to {selected_lang}!")
@@ -0,0 +1,98 @@
+import torch
+
+# Batched decoding for Encoderlstm / DecoderLSTM. Every document in the batch (and
+# every beam) advances one token per decoder call. Nothing is read back to Python
+# inside the loop except an "all finished?" check every `check_every` steps.
+
+def source_mask(input_ids, lengths):
+    # (batch_size, src_len) bool, True on real tokens
+    if lengths is None:
+        return None
+    positions = torch.arange(input_ids.size(1), device=input_ids.device)
+    return positions.unsqueeze(0) < lengths.to(input_ids.device).unsqueeze(1)
+
+def _strip(rows, eos_id):
+    # Token lists cut at the first EOS (EOS itself dropped)
+    return [row[:row.index(eos_id)] if eos_id in row else row for row in rows]
+
+@torch.no_grad()
+def greedy_decode(encoder, decoder, input_ids, bos_id, eos_id, max_len=100, lengths=None, check_every=16):
+    # input_ids: (batch_size, src_len), padded; lengths: real length per row (needed when rows differ)
+    # Returns one list of token ids per document, without BOS/EOS
+    batch_size = input_ids.size(0)
+    device = input_ids.device
+    src_mask = source_mask(input_ids, lengths)
+    encoder_outputs, hidden = encoder(input_ids, lengths)
+    encoder_keys = decoder.project_encoder(encoder_outputs)
+
+    tokens = torch.full((batch_size, 1), bos_id, dtype=torch.long, device=device)
+    finished = torch.zeros(batch_size, dtype=torch.bool, device=device)
+    outputs = []
+    for step in range(max_len):
+        logits, hidden = decoder(tokens, hidden, encoder_outputs, src_mask, encoder_keys)
+        next_tokens = logits[:, -1].argmax(dim=-1)
+        # Finished documents keep emitting EOS
+        next_tokens = next_tokens.masked_fill(finished, eos_id)
+        outputs.append(next_tokens)
+        finished |= next_tokens == eos_id
+        tokens = next_tokens.unsqueeze(1)
+        if (step + 1) % check_every == 0 and finished.all():
+            break
+    return _strip(torch.stack(outputs, dim=1).tolist(), eos_id)
+
+@torch.no_grad()
+def beam_search(encoder, decoder, input_ids, bos_id, eos_id, beam_size=4, max_len=100, length_penalty=0.6,
+                lengths=None, check_every=16):
+    # Beam search over the whole batch at once: (batch_size * beam_size) decoder rows.
+    # Hypotheses are ranked by log-prob / ((5 + length) / 6) ** length_penalty (GNMT);
+    # length_penalty=0 ranks by raw log-prob, which favours short summaries.
+    batch_size = input_ids.size(0)
+    device = input_ids.device
+    src_mask = source_mask(input_ids, lengths)
+    encoder_outputs, (h, c) = encoder(input_ids, lengths)
+
+    # Every beam of a document reads the same encoder states
+    encoder_keys = decoder.project_encoder(encoder_outputs).repeat_interleave(beam_size, dim=0)
+    encoder_outputs = encoder_outputs.repeat_interleave(beam_size, dim=0)
+    hidden = (h.repeat_interleave(beam_size, dim=1), c.repeat_interleave(beam_size, dim=1))
+    if src_mask is not None:
+        src_mask = src_mask.repeat_interleave(beam_size, dim=0)
+
+    # Only the first beam is live at the start, so the first step doesn't pick K copies of one token
+    scores = torch.full((batch_size, beam_size), float('-inf'), device=device)
+    scores[:, 0] = 0
+    finished = torch.zeros(batch_size, beam_size, dtype=torch.bool, device=device)
+    hyp_lengths = torch.zeros(batch_size, beam_size, dtype=torch.long, device=device)
+    history = torch.zeros(batch_size, beam_size, 0, dtype=torch.long, device=device)
+    tokens = torch.full((batch_size * beam_size, 1), bos_id, dtype=torch.long, device=device)
+    row_offsets = (torch.arange(batch_size, device=device) * beam_size).unsqueeze(1)
+    eos_only = None
+
+    for step in range(max_len):
+        logits, hidden = decoder(tokens, hidden, encoder_outputs, src_mask, encoder_keys)
+        log_probs = torch.log_softmax(logits[:, -1].float(), dim=-1).view(batch_size, beam_size, -1)
+        vocab_size = log_probs.size(-1)
+        if eos_only is None:
+            eos_only = torch.full((vocab_size,), float('-inf'), device=device)
+            eos_only[eos_id] = 0
+        # A finished hypothesis can only "continue" with EOS, at no cost, so it keeps its score
+        log_probs = torch.where(finished.unsqueeze(-1), eos_only, log_probs)
+
+        scores, best = (scores.unsqueeze(-1) + log_probs).view(batch_size, -1).topk(beam_size, dim=1)
+        beams, next_tokens = best // vocab_size, best % vocab_size
+
+        finished = finished.gather(1, beams)
+        hyp_lengths = hyp_lengths.gather(1, beams) + (~finished).long()
+        history = torch.cat([history.gather(1, beams.unsqueeze(-1).expand(-1, -1, history.size(2))),
+                             next_tokens.unsqueeze(-1)], dim=2)
+        finished |= next_tokens == eos_id
+
+        rows = (beams + row_offsets).view(-1)
+        hidden = (hidden[0][:, rows], hidden[1][:, rows])
+        tokens = next_tokens.view(-1, 1)
+        if (step + 1) % check_every == 0 and finished.all():
+            break
+
+    normalized = scores / ((5 + hyp_lengths.float()) / 6) ** length_penalty
+    best = normalized.argmax(dim=1)
+    return _strip(history[torch.arange(batch_size, device=device), best].tolist(), eos_id)
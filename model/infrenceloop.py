@@ -1,5 +1,7 @@
-from model.summurizer import Encoderlstm, DecoderLSTM
+from model.summurizer import Encoderlstm, DecoderLSTM, PAD_ID
+from model.decoding import greedy_decode, beam_search
 import torch
+from torch.nn.utils.rnn import pad_sequence
 import sentencepiece as spm
 
 vocab_size = 2000
@@ -12,41 +14,33 @@ encoder.load_state_dict(model['encoder_state_dict'])
 decoder.load_state_dict(model['decoder_state_dict'])
 sp = spm.SentencePieceProcessor('bpe.model')
 
-def generate_summary(encoder, decoder, input_ids,  max_len=100, device='cpu'):
+def generate_summaries(encoder, decoder, texts, max_len=100, device='cpu', beam_size=1, length_penalty=0.6):
+    # Whole batch in one decoding loop, greedy for beam_size=1
     encoder.eval()
     decoder.eval()
 
-    with torch.no_grad():
-        encoder_output, encoder_hidden = encoder(input_ids.to(device))
+    # Start token ID
+    start_token = sp.encode("sostok")[0]
+    eos_token = sp.encode("eostok")[0]
 
-        # Start token ID
-        start_token = sp.encode("sostok")[0]
-        eos_token = sp.encode("eostok")[0]
+    sources = [torch.tensor(sp.encode(text)) for text in texts]
+    lengths = torch.tensor([len(source) for source in sources])
+    input_ids = pad_sequence(sources, batch_first=True, padding_value=PAD_ID).to(device)
 
-        decoder_input = torch.tensor([[start_token]], device=device)
-        decoder_hidden = encoder_hidden
+    if beam_size > 1:
+        ids = beam_search(encoder, decoder, input_ids, start_token, eos_token, beam_size=beam_size,
+                          max_len=max_len, length_penalty=length_penalty, lengths=lengths)
+    else:
+        ids = greedy_decode(encoder, decoder, input_ids, start_token, eos_token, max_len=max_len, lengths=lengths)
+    return [sp.decode(row) for row in ids]
 
-        summary_ids = [start_token]
-
-        for _ in range(max_len):
-            output, decoder_hidden = decoder(decoder_input, decoder_hidden, encoder_output)
-            logits = output[:, -1, :] if output.dim() == 3 else output  # Handle shape (1, 1, vocab) or (1, vocab)
-
-            next_token = logits.argmax(1).item()
-            summary_ids.append(next_token)
-
-            # 🛑 Stop if <eostok>
-            if next_token == eos_token:
-                break
-            decoder_input = torch.tensor([[next_token]], device=device)
-    return sp.decode(summary_ids)  # remove <sostok> when returning
+def generate_summary(encoder, decoder, text, max_len=100, device='cpu', beam_size=1):
+    return generate_summaries(encoder, decoder, [text], max_len, device, beam_size)[0]
 
 #example
 import pandas as pd
 df = pd.read_json('output\General_text_text_cleaned.jsonl', lines = True)
 text = df.at[0, 'cleaned_text']
-text = sp.encode(text)
-text = torch.tensor(text).unsqueeze(0)
 output = generate_summary(encoder, decoder, text)
 print("output generated by model: ", output)
 print("original output: ", df.at[0, 'cleaned_abstract'])
\ No newline at end of file
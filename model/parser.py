@@ -1,5 +1,11 @@
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import codecs
 import logging
+import mmap
+import multiprocessing
+import os
+import tempfile
 from pdfminer.high_level import extract_text
 import pdfplumber
 import fitz
@@ -26,14 +32,153 @@ except ImportError:
 class FileParserError(Exception):
     pass
 
+SNIFF_BYTES = 64 * 1024
+TEXT_BLOCK_BYTES = 1024 * 1024
+
+# Longest first: the UTF-32 LE BOM starts with the UTF-16 LE one
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+# Bytes cp1252 leaves undefined; seeing one means the text is not cp1252
+_CP1252_UNDEFINED = {0x81, 0x8d, 0x8f, 0x90, 0x9d}
+
+def detect_encoding(sample):
+    """
+    Guess the encoding of a text file from its first bytes: a BOM if present,
+    else NUL-byte patterns for BOM-less UTF-16, else UTF-8 if the sample is
+    valid UTF-8, else cp1252 or latin-1.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if not sample:
+        return 'utf-8'
+
+    # ASCII-heavy UTF-16 has a NUL in every other byte
+    even_nuls = sample[0::2].count(0)
+    odd_nuls = sample[1::2].count(0)
+    half = len(sample) / 2
+    if odd_nuls > 0.3 * half and even_nuls < 0.05 * half:
+        return 'utf-16-le'
+    if even_nuls > 0.3 * half and odd_nuls < 0.05 * half:
+        return 'utf-16-be'
+
+    try:
+        # final=False: the sample may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final = False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    if _CP1252_UNDEFINED.isdisjoint(sample):
+        return 'cp1252'
+    return 'latin-1'
+
+def _extract_page_range(path, start, stop):
+    """
+    Worker: PyMuPDF text of pages [start, stop) as (page_number, text) pairs.
+    A page PyMuPDF can't read falls back to pdfplumber, then pdfminer, on its own.
+    """
+    pages = []
+    with fitz.open(path) as doc:
+        for index in range(start, stop):
+            try:
+                text = doc.load_page(index).get_text()
+            except Exception as e:
+                logging.warning(f"PyMuPDF failed on page {index + 1}: {e}, trying fallbacks...")
+                text = _extract_page_fallback(path, index)
+            pages.append((index + 1, text.strip()))
+    return pages
+
+def _extract_page_fallback(path, index):
+    if PDFPLUMBER_AVAILABLE:
+        try:
+            with pdfplumber.open(path, pages = [index + 1]) as pdf:
+                return pdf.pages[0].extract_text() or ""
+        except Exception as e:
+            logging.warning(f"pdfplumber failed on page {index + 1}: {e}")
+    try:
+        return extract_text(path, page_numbers = [index])
+    except Exception as e:
+        logging.warning(f"pdfminer failed on page {index + 1}: {e}, page skipped")
+        return ""
+
 class Parser:
     """
     A comprehensive parser for document and PDF files 
     Supports multiple PDF parsing libraries for better compatibility
     """
 
-    def __init__(self):
+    def __init__(self, pdf_workers = None, pages_per_task = 16):
         self.supported_extensions = {'.txt', '.text', '.pdf'}
+        self.pdf_workers = pdf_workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
+        self._pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def iter_pdf_pages(self, file_path):
+        """
+        Yield (page_number, text) for every page, in order, as soon as each page
+        range is extracted. Ranges of `pages_per_task` pages run on a process pool,
+        so page 1 can be processed downstream while later pages are still extracting.
+        """
+        if not PDF_MUPDF_AVAILABLE:
+            raise FileParserError("iter_pdf_pages needs PyMuPDF")
+
+        temp_path = None
+        if hasattr(file_path, 'read'):
+            # Workers need something they can open; spool uploads to disk once
+            with tempfile.NamedTemporaryFile(suffix = ".pdf", delete = False) as tmp:
+                tmp.write(file_path.read())
+                temp_path = tmp.name
+            if hasattr(file_path, 'seek'):
+                file_path.seek(0)
+            path = temp_path
+        else:
+            path = str(file_path)
+
+        try:
+            with fitz.open(path) as doc:
+                page_count = len(doc)
+            ranges = [
+                (start, min(start + self.pages_per_task, page_count))
+                for start in range(0, page_count, self.pages_per_task)
+            ]
+            if len(ranges) <= 1 or self.pdf_workers <= 1:
+                for start, stop in ranges:
+                    yield from _extract_page_range(path, start, stop)
+                return
+
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers = self.pdf_workers,
+                    mp_context = multiprocessing.get_context("spawn")
+                )
+            futures = [self._pool.submit(_extract_page_range, path, start, stop) for start, stop in ranges]
+            try:
+                for future in futures:
+                    yield from future.result()
+            finally:
+                # Consumer stopped early: don't extract pages nobody will read
+                for future in futures:
+                    future.cancel()
+        finally:
+            if temp_path is not None:
+                os.unlink(temp_path)
+
+    def preprocess_text(self, text):
+        """
+        Light normalization of extracted text. Cleaning and sentence
+        segmentation happen later in backend/utils/preprocess.py
+        """
+        return text.strip()
 
     def parse_file(self, file_path):
         """
@@ -83,6 +228,8 @@ class Parser:
     def _parse_pdf_file(self, file_path):
         methods = []
         
+        if PDF_MUPDF_AVAILABLE:
+            methods.append(self._parse_pdf_with_pages)
         if PDFPLUMBER_AVAILABLE:
             methods.append(self._parse_pdf_with_plumber)
         if PDF_MUPDF_AVAILABLE:
@@ -104,6 +251,11 @@ class Parser:
         
         raise FileParserError(f"All PDF parsing methods failed. Last error: {last_error}")
     
+    def _parse_pdf_with_pages(self, file_path):
+        """Parallel PyMuPDF extraction with per-page fallback (fastest)"""
+        full_text = '\n\n'.join(text for _, text in self.iter_pdf_pages(file_path) if text)
+        return self.preprocess_text(full_text)
+
     def _parse_pdf_with_plumber(self, file_path):
         """Parse PDF with pdfplumber (best for complex layouts)"""
         text_content = []
@@ -181,37 +333,44 @@ class Parser:
             print(f"[ERROR] PDFMiner failed to parse: {e}")
             raise e
         
-    def _parse_text_file(self, file_path):
-        encodings = ['utf-8', 'utf-16', 'latin-1', 'cp1252']
-        
-        # Handle both file paths and file-like objects
+    def iter_text_blocks(self, file_path, block_bytes = TEXT_BLOCK_BYTES):
+        """
+        Yield the decoded text of a text file in blocks of about `block_bytes`.
+        Files on disk are memory-mapped and decoded in a single incremental pass,
+        so memory stays flat whatever the file size.
+        """
         if hasattr(file_path, 'read'):
-            raw_bytes = file_path.read()
-            if isinstance(raw_bytes, str):
+            first = file_path.read(SNIFF_BYTES)
+            if isinstance(first, str):
                 # Already decoded
-                content = raw_bytes
-            else:
-                content = None
-                for encoding in encodings:
-                    try:
-                        content = raw_bytes.decode(encoding)
-                        break
-                    except UnicodeDecodeError:
-                        continue
+                yield first
+                while block := file_path.read(block_bytes):
+                    yield block
+                return
+            decoder = codecs.getincrementaldecoder(detect_encoding(first))(errors = 'replace')
+            block = first
+            while block:
+                text = decoder.decode(block)
+                if text:
+                    yield text
+                block = file_path.read(block_bytes)
         else:
             with open(file_path, 'rb') as f:
-                raw_bytes = f.read()
-            content = None
-            for encoding in encodings:
-                try:
-                    content = raw_bytes.decode(encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-
-        if content is None:
-            raise FileParserError(f"Could not decode text file with any supported encoding")
-        
+                if os.fstat(f.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+                    decoder = codecs.getincrementaldecoder(detect_encoding(mm[:SNIFF_BYTES]))(errors = 'replace')
+                    for start in range(0, len(mm), block_bytes):
+                        # The decoder carries a character split across blocks over to the next one
+                        text = decoder.decode(mm[start:start + block_bytes])
+                        if text:
+                            yield text
+        tail = decoder.decode(b'', final = True)
+        if tail:
+            yield tail
+
+    def _parse_text_file(self, file_path):
+        content = ''.join(self.iter_text_blocks(file_path))
         processed_content = self.preprocess_text(content)
         # processed_content = self.summury_generated(processed_content)
-        return processed_content
\ No newline at end of file
+        return processed_content
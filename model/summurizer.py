@@ -2,12 +2,166 @@ import pandas as pd
 import sentencepiece as spm
 import os
 import ast
+import json
+import numpy as np
 import torch
 from torch import nn
 from torch.nn import Embedding, LSTM
-from torch.utils.data import DataLoader, Dataset
-from torch.nn.utils.rnn import pad_sequence
+from torch.utils.data import DataLoader, Dataset, Sampler
+from torch.nn.utils.rnn import pad_sequence, pack_padded_sequence, pad_packed_sequence
 import gc
+import copy
+from model.token_shards import TokenShards
+from model.decoding import source_mask
+
+# <pad> as reserved by model/tokenization.py. Not 0: that is SentencePiece's <unk>,
+# a real token the loss has to see. Trainer's loss_fn must use it as ignore_index
+PAD_ID = 3
+
+# Token dataset: (text tokens, abstract tokens) pairs
+class TokenDataset(Dataset):
+    def __init__(self, inputs, targets):
+        # Token lists read from csv are strings like "[12, 5, ...]"; parse them once here
+        # instead of on every __getitem__ (json is much faster than ast for this)
+        self.inputs = [self._to_tensor(i) for i in inputs]
+        self.targets = [self._to_tensor(t) for t in targets]
+        self.lengths = [(len(i), len(t)) for i, t in zip(self.inputs, self.targets)]
+
+    @classmethod
+    def from_csv(cls, path, input_column='text_tokens', target_column='abstract_tokens'):
+        df = pd.read_csv(path, usecols=[input_column, target_column])
+        return cls(df[input_column], df[target_column])
+
+    @staticmethod
+    def _to_tensor(tokens):
+        if isinstance(tokens, str):
+            try:
+                tokens = json.loads(tokens)
+            except ValueError:
+                tokens = ast.literal_eval(tokens)
+        return torch.as_tensor(tokens, dtype=torch.long)
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def __getitem__(self, idx):
+        return {"input_ids": self.inputs[idx], "target_ids": self.targets[idx]}
+
+# Same examples read from memory-mapped token shards (model/token_shards.py)
+class ShardDataset(Dataset):
+    def __init__(self, path, input_column='text_tokens', target_column='abstract_tokens'):
+        self.shards = TokenShards(path)
+        self.input_column = input_column
+        self.target_column = target_column
+        self.lengths = np.stack([self.shards.lengths(input_column), self.shards.lengths(target_column)], axis=1)
+
+    def __len__(self):
+        return len(self.shards)
+
+    def __getitem__(self, idx):
+        # Only this example is copied out of the page cache, widened to int64 for nn.Embedding
+        return {
+            "input_ids": torch.from_numpy(self.shards.get(self.input_column, idx).astype(np.int64)),
+            "target_ids": torch.from_numpy(self.shards.get(self.target_column, idx).astype(np.int64))
+        }
+
+# padding sequences, only up to the longest example in the batch
+def collate_fn(batch):
+    inputs = [i["input_ids"] for i in batch]
+    targets = [i["target_ids"] for i in batch]
+    return {
+        "input_ids": pad_sequence(inputs, batch_first=True, padding_value=PAD_ID),
+        "target_ids": pad_sequence(targets, batch_first=True, padding_value=PAD_ID),
+        "input_lengths": torch.tensor([len(i) for i in inputs]),
+        "target_lengths": torch.tensor([len(t) for t in targets])
+    }
+
+# Batches of similar-length examples, so little of each batch is padding
+class LengthBucketSampler(Sampler):
+    def __init__(self, lengths, batch_size=8, max_tokens=None, bucket_size=100, shuffle=True, drop_last=False, seed=0):
+        # lengths: (input_len, target_len) per example, e.g. TokenDataset.lengths or ShardDataset.lengths
+        # max_tokens: if set, batches are filled up to this many padded (input + target)
+        #   tokens instead of a fixed batch_size, so short examples go in bigger batches
+        # bucket_size: examples are shuffled, then sorted by length within windows of
+        #   bucket_size batches; larger windows pad less but mix less
+        self.lengths = np.asarray(lengths, dtype=np.int64).reshape(-1, 2)
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.bucket_size = bucket_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+        self._batches = None
+
+    def set_epoch(self, epoch):
+        # Called by Trainer.train so every epoch gets a different, reproducible order
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self._batches = None
+
+    def _build(self):
+        generator = torch.Generator().manual_seed(self.seed + self.epoch)
+        if self.shuffle:
+            order = torch.randperm(len(self.lengths), generator=generator).numpy()
+        else:
+            order = np.arange(len(self.lengths))
+
+        window = self.bucket_size * self.batch_size
+        batches = []
+        for start in range(0, len(order), window):
+            bucket = order[start:start + window]
+            lengths = self.lengths[bucket]
+            bucket = bucket[np.lexsort((lengths[:, 1], lengths[:, 0]))]
+            batches.extend(self._split(bucket.tolist(), self.lengths[bucket].tolist()))
+
+        if self.shuffle:
+            batches = [batches[i] for i in torch.randperm(len(batches), generator=generator).tolist()]
+        return batches
+
+    def _split(self, bucket, lengths):
+        batches, batch, max_input, max_target = [], [], 0, 0
+        for i, (input_len, target_len) in zip(bucket, lengths):
+            if batch:
+                padded = (len(batch) + 1) * (max(max_input, input_len) + max(max_target, target_len))
+                full = len(batch) >= self.batch_size if self.max_tokens is None else padded > self.max_tokens
+                if full:
+                    batches.append(batch)
+                    batch, max_input, max_target = [], 0, 0
+            batch.append(i)
+            max_input, max_target = max(max_input, input_len), max(max_target, target_len)
+        if batch and not (self.drop_last and self.max_tokens is None and len(batch) < self.batch_size):
+            batches.append(batch)
+        return batches
+
+    def __iter__(self):
+        if self._batches is None:
+            self._batches = self._build()
+        return iter(self._batches)
+
+    def __len__(self):
+        if self._batches is None:
+            self._batches = self._build()
+        return len(self._batches)
+
+def make_dataloader(dataset, batch_size=8, max_tokens=None, shuffle=True, num_workers=2, prefetch_factor=4, seed=0):
+    # Workers collate the next batches while the model trains on the current one
+    sampler = LengthBucketSampler(dataset.lengths, batch_size=batch_size, max_tokens=max_tokens, shuffle=shuffle, seed=seed)
+    return DataLoader(
+        dataset,
+        batch_sampler=sampler,
+        collate_fn=collate_fn,
+        num_workers=num_workers,
+        prefetch_factor=prefetch_factor if num_workers > 0 else None,
+        persistent_workers=num_workers > 0,
+        pin_memory=torch.cuda.is_available()
+    )
+
+def padding_efficiency(batch):
+    # Share of the padded input and target tensors that is real tokens
+    real_inputs = batch["input_lengths"].sum().item() if "input_lengths" in batch else (batch["input_ids"] != PAD_ID).sum().item()
+    real_targets = batch["target_lengths"].sum().item() if "target_lengths" in batch else (batch["target_ids"] != PAD_ID).sum().item()
+    return real_inputs, batch["input_ids"].numel(), real_targets, batch["target_ids"].numel()
 
 # Encoder class
 class Encoderlstm(torch.nn.Module):
@@ -16,9 +170,16 @@ class Encoderlstm(torch.nn.Module):
         self.embedding = nn.Embedding(num_embeddings=vocab_size, embedding_dim=embedding_dim)
         self.lstm = nn.LSTM(input_size=embedding_dim, hidden_size=hidden_size, batch_first=True)
 
-    def forward(self, input_ids):
+    def forward(self, input_ids, lengths=None):
+        # lengths: real length of each padded row; packing keeps the padding out of the
+        # final (h, c), and the outputs past each length come back as zeros
         x = self.embedding(input_ids)
-        outputs, (h, c) = self.lstm(x)
+        if lengths is None:
+            outputs, (h, c) = self.lstm(x)
+            return outputs, (h, c)
+        packed = pack_padded_sequence(x, lengths.cpu(), batch_first=True, enforce_sorted=False)
+        outputs, (h, c) = self.lstm(packed)
+        outputs, _ = pad_packed_sequence(outputs, batch_first=True, total_length=input_ids.size(1))
         return outputs, (h, c)
 
 # Fixed Decoder class with memory-efficient attention
@@ -33,35 +194,47 @@ class DecoderLSTM(torch.nn.Module):
         self.attention = nn.Linear(hidden_size * 2, hidden_size)
         self.context_projection = nn.Linear(hidden_size, hidden_size)
 
-    def forward(self, input_token, hidden_state, encoder_outputs):
-        # input_token: (batch_size, 1)
-        # hidden_state: tuple of (h, c) where h,c are (1, batch_size, hidden_size)
-        # encoder_outputs: (batch_size, src_len, hidden_size)
+    def project_encoder(self, encoder_outputs):
+        # self.attention sees cat([h, encoder_output]), so its weight splits into
+        # W[:, :hidden] for h and W[:, hidden:] for the encoder. The encoder half doesn't
+        # change while one source is decoded: compute it once, pass it to every step
+        hidden_size = self.lstm.hidden_size
+        return nn.functional.linear(encoder_outputs, self.attention.weight[:, hidden_size:], self.attention.bias)
 
-        batch_size = input_token.size(0)
-        src_len = encoder_outputs.size(1)
+    def attend(self, h, encoder_outputs, encoder_keys, src_mask=None):
+        # h: (batch_size, hidden_size), encoder_keys: project_encoder(encoder_outputs)
+        # Same as tanh(attention(cat([h expanded to src_len, encoder_outputs]))), without
+        # building the (batch_size, src_len, hidden_size*2) tensor or redoing the encoder half
+        query = nn.functional.linear(h, self.attention.weight[:, :self.lstm.hidden_size])  # (batch_size, hidden_size)
+        energy = (encoder_keys + query.unsqueeze(1)).tanh_()  # (batch_size, src_len, hidden_size)
 
-        # Embed input token
-        embedded = self.embedding(input_token)  # (batch_size, 1, embedding_dim)
+        # Attention weights
+        scores = energy.sum(dim=2)  # (batch_size, src_len)
+        if src_mask is not None:
+            scores = scores.masked_fill(~src_mask, float('-inf'))
+        attention_weights = torch.softmax(scores, dim=1)  # (batch_size, src_len)
 
-        # Calculate attention weights more efficiently
-        decoder_hidden = hidden_state[0].transpose(0, 1)  # (batch_size, 1, hidden_size)
+        # Context vector
+        context = torch.bmm(attention_weights.unsqueeze(1), encoder_outputs).squeeze(1)  # (batch_size, hidden_size)
 
-        # Expand decoder hidden to match encoder outputs length
-        decoder_hidden_expanded = decoder_hidden.expand(-1, src_len, -1)  # (batch_size, src_len, hidden_size)
+        # Apply context projection to reduce dimension if needed
+        return self.context_projection(context)
 
-        # Concatenate and compute attention
-        combined = torch.cat([decoder_hidden_expanded, encoder_outputs], dim=2)  # (batch_size, src_len, hidden_size*2)
-        energy = torch.tanh(self.attention(combined))  # (batch_size, src_len, hidden_size)
+    def forward(self, input_token, hidden_state, encoder_outputs, src_mask=None, encoder_keys=None):
+        # input_token: (batch_size, 1)
+        # hidden_state: tuple of (h, c) where h,c are (1, batch_size, hidden_size)
+        # encoder_outputs: (batch_size, src_len, hidden_size)
+        # src_mask: optional (batch_size, src_len) bool, False on source padding
+        # encoder_keys: project_encoder(encoder_outputs); pass it when calling step by step
 
-        # Attention weights
-        attention_weights = torch.softmax(energy.sum(dim=2), dim=1)  # (batch_size, src_len)
+        if encoder_keys is None:
+            encoder_keys = self.project_encoder(encoder_outputs)
 
-        # Context vector
-        context = torch.bmm(attention_weights.unsqueeze(1), encoder_outputs)  # (batch_size, 1, hidden_size)
+        # Embed input token
+        embedded = self.embedding(input_token)  # (batch_size, 1, embedding_dim)
 
-        # Apply context projection to reduce dimension if needed
-        context = self.context_projection(context)  # (batch_size, 1, hidden_size)
+        # Attention over the encoder outputs, queried with the previous hidden state
+        context = self.attend(hidden_state[0][0], encoder_outputs, encoder_keys, src_mask).unsqueeze(1)  # (batch_size, 1, hidden_size)
 
         # Combine embedding and context
         lstm_input = torch.cat([embedded, context], dim=2)  # (batch_size, 1, embedding_dim + hidden_size)
@@ -74,15 +247,115 @@ class DecoderLSTM(torch.nn.Module):
 
         return logits, new_hidden
 
+    def forward_sequence(self, input_ids, hidden_state, encoder_outputs, src_mask=None):
+        # Teacher-forced decoding of a whole target at once. Same result as calling
+        # forward() per token with the ground truth as input, but the attention query
+        # is h_{t-1}, so only the recurrence itself stays a loop. Everything that does
+        # not depend on it is done once for all steps:
+        #   - embeddings and their share of the LSTM input gates
+        #   - the encoder half of the attention layer
+        #   - the output projection (the largest matmul) after the loop
+        # A single nn.LSTM call can't do this: the context it takes as input would have to
+        # come from h_0 for every step. Priced in benchmarks/bench_lstm_train.py, the loop
+        # costs ~6.6x such a call (1.61 vs 0.25 s forward + backward, batch 8, 400 -> 200).
+        # input_ids: (batch_size, tgt_len), hidden_state: (h, c) each (1, batch_size, hidden_size)
+        embedding_dim = self.embedding.embedding_dim
+
+        w_ih, w_hh = self.lstm.weight_ih_l0, self.lstm.weight_hh_l0
+        w_ih_embedded, w_ih_context = w_ih[:, :embedding_dim], w_ih[:, embedding_dim:]
+
+        embedded = self.embedding(input_ids)  # (batch_size, tgt_len, embedding_dim)
+        input_gates = torch.nn.functional.linear(embedded, w_ih_embedded, self.lstm.bias_ih_l0 + self.lstm.bias_hh_l0)
+        encoder_keys = self.project_encoder(encoder_outputs)  # (batch_size, src_len, hidden_size)
+
+        h, c = hidden_state[0][0], hidden_state[1][0]  # (batch_size, hidden_size)
+        outputs = []
+        for t in range(input_ids.size(1)):
+            context = self.attend(h, encoder_outputs, encoder_keys, src_mask)
+
+            # LSTM cell, gates in PyTorch's i, f, g, o order
+            gates = input_gates[:, t] + context @ w_ih_context.t() + h @ w_hh.t()
+            i, f, g, o = gates.chunk(4, dim=1)
+            c = torch.sigmoid(f) * c + torch.sigmoid(i) * torch.tanh(g)
+            h = torch.sigmoid(o) * torch.tanh(c)
+            outputs.append(h)
+
+        logits = self.output_projection(torch.stack(outputs, dim=1))  # (batch_size, tgt_len, vocab_size)
+        return logits, (h.unsqueeze(0), c.unsqueeze(0))
+
 # Memory-efficient Trainer
 class Trainer:
     def __init__(self, encoder, decoder, optimizer, loss_fn, device):
         self.encoder = encoder
         self.decoder = decoder
         self.optimizer = optimizer
-        self.loss_fn = loss_fn
+        if getattr(loss_fn, "ignore_index", None) != PAD_ID:
+            raise ValueError(f"loss_fn must skip padding, e.g. nn.CrossEntropyLoss(ignore_index={PAD_ID})")
+        # Summed here, divided by the real target tokens in each loss below
+        self.loss_fn = copy.copy(loss_fn)
+        self.loss_fn.reduction = "sum"
         self.device = device
 
+    @staticmethod
+    def real_tokens(target_ids):
+        # Predicted target positions that are not padding, at least 1 so an empty batch gives 0 loss
+        return (target_ids[:, 1:] != PAD_ID).sum().clamp(min=1)
+
+    def teacher_forced_loss(self, target_ids, encoder_hidden, encoder_outputs, src_mask=None):
+        logits, _ = self.decoder.forward_sequence(target_ids[:, :-1], encoder_hidden, encoder_outputs, src_mask)
+        # Loss over all steps at once, the mean over real target tokens
+        loss = self.loss_fn(logits.reshape(-1, logits.size(-1)), target_ids[:, 1:].reshape(-1))
+        return loss / self.real_tokens(target_ids)
+
+    def free_running_loss(self, target_ids, encoder_hidden, encoder_outputs, src_mask=None):
+        # Each step's input is the previous prediction, so this one has to go token by token
+        tgt_len = target_ids.size(1)
+        encoder_keys = self.decoder.project_encoder(encoder_outputs)
+        decoder_hidden = encoder_hidden
+        decoder_input = target_ids[:, 0:1]  # (batch_size, 1) - start token
+        total_loss_batch = 0
+        for t in range(1, tgt_len):
+            decoder_output, decoder_hidden = self.decoder(decoder_input, decoder_hidden, encoder_outputs,
+                                                          src_mask, encoder_keys)
+            logits = decoder_output.squeeze(1)  # (batch_size, vocab_size)
+            total_loss_batch += self.loss_fn(logits, target_ids[:, t])
+            decoder_input = logits.argmax(dim=1, keepdim=True)
+        # Same mean over real target tokens as teacher_forced_loss. Averaging per-step
+        # means would overweight the late steps few rows reach, and is NaN on a step
+        # that is all padding
+        return total_loss_batch / self.real_tokens(target_ids)
+
+    def train_step(self, batch, teacher_forcing_ratio=0.5):
+        # One optimizer step on a collate_fn batch; returns the loss
+        input_ids = batch["input_ids"].to(self.device, non_blocking=True)
+        target_ids = batch["target_ids"].to(self.device, non_blocking=True)
+        input_lengths = batch.get("input_lengths")
+
+        # Encode source. With lengths the encoder packs the padded rows and attention
+        # skips the padding, the same as greedy_decode / beam_search see at inference
+        encoder_outputs, encoder_hidden = self.encoder(input_ids, input_lengths)
+        src_mask = source_mask(input_ids, input_lengths)
+
+        # Scheduled sampling, decided once per batch: a teacher-forced batch
+        # decodes the whole target in one pass, the rest feed back predictions
+        if torch.rand(1).item() < teacher_forcing_ratio:
+            avg_loss = self.teacher_forced_loss(target_ids, encoder_hidden, encoder_outputs, src_mask)
+        else:
+            avg_loss = self.free_running_loss(target_ids, encoder_hidden, encoder_outputs, src_mask)
+
+        # Backward pass
+        self.optimizer.zero_grad()
+        avg_loss.backward()
+
+        # Gradient clipping to prevent exploding gradients
+        torch.nn.utils.clip_grad_norm_(
+            list(self.encoder.parameters()) + list(self.decoder.parameters()),
+            max_norm=1.0
+        )
+
+        self.optimizer.step()
+        return avg_loss.item()
+
     def train(self, dataloader, epochs=5, teacher_forcing_ratio=0.5, checkpoint_path='/content/drive/MyDrive/Auto Summrizer/check_point/checkpoint.pth'):
         self.encoder.train()
         self.decoder.train()
@@ -104,6 +377,9 @@ class Trainer:
 
         for epoch in range(start_epoch, epochs):
             total_loss = 0
+            padding = [0, 0, 0, 0]  # real / padded input tokens, real / padded target tokens
+            if hasattr(dataloader.batch_sampler, 'set_epoch'):
+                dataloader.batch_sampler.set_epoch(epoch)
 
             for batch_idx, batch in enumerate(dataloader):
                 # Clear cache periodically
@@ -111,74 +387,21 @@ class Trainer:
                     torch.cuda.empty_cache() if torch.cuda.is_available() else None
                     gc.collect()
 
-                input_ids = batch["input_ids"].to(self.device)
-                target_ids = batch["target_ids"].to(self.device)
-
-                batch_size, tgt_len = target_ids.shape
-                vocab_size = self.decoder.output_projection.out_features
-
-                # Encode source
-                encoder_outputs, encoder_hidden = self.encoder(input_ids)
-
-                # Initialize decoder
-                decoder_hidden = encoder_hidden
-                decoder_input = target_ids[:, 0:1].to(self.device)  # (batch_size, 1) - start token
-
-                total_loss_batch = 0
-
-                # Decode step by step
-                for t in range(1, tgt_len):
-                    # Move decoder_hidden to the correct device if needed
-                    decoder_hidden = (decoder_hidden[0].to(self.device), decoder_hidden[1].to(self.device))
-
-                    # Forward pass
-                    decoder_output, decoder_hidden = self.decoder(
-                        decoder_input, decoder_hidden, encoder_outputs
-                    )
-
-                    # Get logits for current step
-                    logits = decoder_output.squeeze(1)  # (batch_size, vocab_size)
-
-                    # Calculate loss for current step
-                    targets = target_ids[:, t]  # (batch_size,)
-                    loss = self.loss_fn(logits, targets)
-                    total_loss_batch += loss
-
-                    # Teacher forcing
-                    if torch.rand(1).item() < teacher_forcing_ratio:
-                        decoder_input = target_ids[:, t:t+1].to(self.device)  # Use ground truth
-                    else:
-                        decoder_input = logits.argmax(dim=1, keepdim=True).to(self.device)  # Use prediction
-
-
-                # Average loss across sequence length
-                avg_loss = total_loss_batch / (tgt_len - 1)
-
-                # Backward pass
-                self.optimizer.zero_grad()
-                avg_loss.backward()
-
-                # Gradient clipping to prevent exploding gradients
-                torch.nn.utils.clip_grad_norm_(
-                    list(self.encoder.parameters()) + list(self.decoder.parameters()),
-                    max_norm=1.0
-                )
-
-                self.optimizer.step()
-
-                total_loss += avg_loss.item()
+                padding = [total + count for total, count in zip(padding, padding_efficiency(batch))]
+                loss = self.train_step(batch, teacher_forcing_ratio)
+                total_loss += loss
 
                 # Clear variables
-                del encoder_outputs, encoder_hidden, decoder_hidden
                 torch.cuda.empty_cache() if torch.cuda.is_available() else None
                 gc.collect()
 
 
                 if batch_idx % 50 == 0:
-                    print(f"Epoch {epoch+1}, Batch {batch_idx}, Loss: {avg_loss.item():.4f}")
+                    print(f"Epoch {epoch+1}, Batch {batch_idx}, Loss: {loss:.4f}")
 
             avg_epoch_loss = total_loss / len(dataloader)
             print(f"Epoch [{epoch+1}/{epochs}] Average Loss: {avg_epoch_loss:.4f}")
+            print(f"Padding efficiency: inputs {padding[0] / max(1, padding[1]):.1%}, targets {padding[2] / max(1, padding[3]):.1%}")
 
             # Save checkpoint
             checkpoint = {
@@ -0,0 +1,99 @@
+import json
+import os
+import numpy as np
+
+# Tokenized corpus on disk, one directory per split:
+#   meta.json                       columns, dtype, rows and shard list
+#   <column>-00000.bin              all token ids of the shard's rows, back to back
+#   <column>-00000.idx.npy          int64 offsets, row i is tokens[offsets[i]:offsets[i+1]]
+# Shards are memory-mapped on read, so opening a split costs almost no RAM and
+# a row is a slice of the page cache, not a parsed string.
+
+SHARD_ROWS = 100_000
+ENCODE_BATCH_ROWS = 10_000
+
+def token_dtype(vocab_size):
+    return np.uint16 if vocab_size <= np.iinfo(np.uint16).max + 1 else np.int32
+
+def write_shards(path, sp, columns, shard_rows=SHARD_ROWS, batch_rows=ENCODE_BATCH_ROWS, num_threads=-1):
+    # columns: {name: list of texts}, all of the same length, e.g. {"text_tokens": texts, "abstract_tokens": abstracts}
+    # Texts are encoded batch_rows at a time by SentencePiece's own thread pool (num_threads=-1: all cores)
+    os.makedirs(path, exist_ok=True)
+    rows = {len(texts) for texts in columns.values()}
+    if len(rows) != 1:
+        raise ValueError(f"columns have different lengths: { {name: len(texts) for name, texts in columns.items()} }")
+    rows = rows.pop()
+    dtype = token_dtype(sp.get_piece_size())
+
+    shards = []
+    for shard, start in enumerate(range(0, rows, shard_rows)):
+        stop = min(rows, start + shard_rows)
+        for name, texts in columns.items():
+            _write_shard(path, f"{name}-{shard:05d}", sp, texts[start:stop], dtype, batch_rows, num_threads)
+        shards.append({"index": shard, "rows": stop - start})
+
+    meta = {
+        "columns": list(columns),
+        "dtype": np.dtype(dtype).name,
+        "vocab_size": sp.get_piece_size(),
+        "rows": rows,
+        "shards": shards
+    }
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def _write_shard(path, stem, sp, texts, dtype, batch_rows, num_threads):
+    offsets = [0]
+    with open(os.path.join(path, f"{stem}.bin"), "wb") as out:
+        for start in range(0, len(texts), batch_rows):
+            batch = [str(text) for text in texts[start:start + batch_rows]]
+            for ids in sp.encode(batch, num_threads=num_threads):
+                out.write(np.asarray(ids, dtype=dtype).tobytes())
+                offsets.append(offsets[-1] + len(ids))
+    np.save(os.path.join(path, f"{stem}.idx.npy"), np.asarray(offsets, dtype=np.int64))
+
+class TokenShards:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.columns = self.meta["columns"]
+        self.dtype = np.dtype(self.meta["dtype"])
+        # Global row number of each shard's first row
+        self._starts = np.cumsum([0] + [shard["rows"] for shard in self.meta["shards"]])
+        self._open()
+
+    def _open(self):
+        self._tokens = {}
+        self._offsets = {}
+        for name in self.columns:
+            self._tokens[name], self._offsets[name] = [], []
+            for shard in self.meta["shards"]:
+                stem = os.path.join(self.path, f"{name}-{shard['index']:05d}")
+                offsets = np.load(f"{stem}.idx.npy", mmap_mode="r")
+                # np.memmap refuses empty files
+                tokens = np.memmap(f"{stem}.bin", dtype=self.dtype, mode="r") if offsets[-1] else np.zeros(0, self.dtype)
+                self._tokens[name].append(tokens)
+                self._offsets[name].append(offsets)
+
+    # DataLoader workers get the path, not a pickled copy of every mapped shard
+    def __getstate__(self):
+        return {"path": self.path, "meta": self.meta, "columns": self.columns, "dtype": self.dtype, "_starts": self._starts}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self):
+        return int(self._starts[-1])
+
+    def get(self, column, idx):
+        # Read-only view into the mapped shard, no copy
+        shard = int(np.searchsorted(self._starts, idx, side="right")) - 1
+        row = idx - self._starts[shard]
+        offsets = self._offsets[column][shard]
+        return self._tokens[column][shard][offsets[row]:offsets[row + 1]]
+
+    def lengths(self, column):
+        return np.concatenate([np.diff(offsets) for offsets in self._offsets[column]])
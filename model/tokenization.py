@@ -1,30 +1,25 @@
 import pandas as pd
 import sentencepiece as spm
+from model.token_shards import write_shards
 
-spm.SentencePieceTrainer.Train(input = ['train_data.csv'], model_prefix = 'bpe', vocab_size = 10000)
+# unk/bos/eos keep SentencePiece's default ids 0/1/2; padding gets its own id
+# (summurizer.PAD_ID) instead of sharing 0 with <unk>
+spm.SentencePieceTrainer.Train(input = ['train_data.csv'], model_prefix = 'bpe', vocab_size = 10000,
+                               unk_id = 0, bos_id = 1, eos_id = 2, pad_id = 3)
 sp = spm.SentencePieceProcessor(model_file = 'bpe.model')
 df1 = pd.read_json('data/clean_train_1.json')
 df2 = pd.read_json('data/clean_train_2.json')
 df3 = pd.read_json('data/test.json')
 
-abstract_tokens_train = []  #500
-text_tokens_train = []  #5000
-text_tokens_test = []
-abstract_tokens_test = []
+# Token ids go to memory-mapped shards (read back with summurizer.ShardDataset),
+# encoded in batches on SentencePiece's thread pool
+train = write_shards('data/train_tokens', sp, {
+    'text_tokens' : df1['cleaned_text'].tolist() + df2['cleaned_text'].tolist(),  #5000
+    'abstract_tokens' : df1['cleaned_abstract'].tolist() + df2['cleaned_abstract'].tolist()  #500
+})
+test = write_shards('data/test_tokens', sp, {
+    'text_tokens' : df3['cleaned_article'].tolist(),
+    'abstract_tokens' : df3['cleaned_abstract'].tolist()
+})
 
-for i in range(len(df1)):
-    abstract_tokens_train.append(sp.encode(df1.at[i, 'cleaned_abstract']))
-    text_tokens_train.append(sp.Encode(df1.at[i, 'cleaned_text']))
-
-for i in range(len(df2)):
-    abstract_tokens_train.append(sp.encode(df2.at[i, 'cleaned_abstract']))
-    text_tokens_train.append(sp.encode(df2.at[i, 'cleaned_text']))
-
-for i in range(len(df3)):
-    text_tokens_test.append(sp.encode(df3.at[i, 'cleaned_article']))
-    abstract_tokens_test.append(sp.encode(df3.at[i, 'cleaned_abstract']))
-
-print(len(text_tokens_train), len(abstract_tokens_train), len(text_tokens_test), len(abstract_tokens_test))
-
-df4 = pd.DataFrame({'abstract_tokens' : abstract_tokens_test, 'text_tokens': text_tokens_test})
-df4.to_csv('test_tokens.csv', index = False)
\ No newline at end of file
+print(train['rows'], test['rows'])
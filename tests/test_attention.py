@@ -0,0 +1,68 @@
+"""
+DecoderLSTM's split attention against the original concatenated attention
+(benchmarks/lstm_reference.py), on the same parameters.
+"""
+import pytest
+import torch
+
+import lstm_reference
+from model.summurizer import DecoderLSTM
+
+VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_SIZE = 200, 16, 32
+BATCH_SIZE, SRC_LEN = 3, 40
+TOLERANCE = dict(rtol = 1e-5, atol = 1e-5)
+
+@pytest.fixture
+def decoder():
+    torch.manual_seed(0)
+    return DecoderLSTM(VOCAB_SIZE, EMBEDDING_DIM, HIDDEN_SIZE).eval()
+
+@pytest.fixture
+def encoder_outputs():
+    return torch.randn(BATCH_SIZE, SRC_LEN, HIDDEN_SIZE)
+
+@pytest.fixture
+def hidden():
+    return torch.randn(1, BATCH_SIZE, HIDDEN_SIZE), torch.randn(1, BATCH_SIZE, HIDDEN_SIZE)
+
+@torch.no_grad()
+def test_attend_matches_reference(decoder, encoder_outputs, hidden):
+    expected = lstm_reference.attention_context(decoder, hidden, encoder_outputs).squeeze(1)
+    context = decoder.attend(hidden[0][0], encoder_outputs, decoder.project_encoder(encoder_outputs))
+    torch.testing.assert_close(context, expected, **TOLERANCE)
+
+@torch.no_grad()
+def test_attend_mask_matches_shorter_source(decoder, encoder_outputs, hidden):
+    # Masked-out positions must not change the context: same as attending over the real prefix
+    lengths = torch.tensor([SRC_LEN, 25, 1])
+    src_mask = torch.arange(SRC_LEN).unsqueeze(0) < lengths.unsqueeze(1)
+    context = decoder.attend(hidden[0][0], encoder_outputs, decoder.project_encoder(encoder_outputs), src_mask)
+    for row, length in enumerate(lengths.tolist()):
+        row_hidden = tuple(state[:, row:row + 1] for state in hidden)
+        expected = lstm_reference.attention_context(decoder, row_hidden, encoder_outputs[row:row + 1, :length])
+        torch.testing.assert_close(context[row:row + 1], expected.squeeze(1), **TOLERANCE)
+
+@torch.no_grad()
+def test_greedy_steps_match_reference(decoder, encoder_outputs, hidden):
+    encoder_keys = decoder.project_encoder(encoder_outputs)
+    old_tokens = new_tokens = torch.randint(0, VOCAB_SIZE, (BATCH_SIZE, 1))
+    old_hidden = new_hidden = hidden
+    for _ in range(10):
+        old_logits, old_hidden = lstm_reference.decoder_step(decoder, old_tokens, old_hidden, encoder_outputs)
+        new_logits, new_hidden = decoder(new_tokens, new_hidden, encoder_outputs, encoder_keys = encoder_keys)
+        torch.testing.assert_close(new_logits, old_logits, **TOLERANCE)
+        torch.testing.assert_close(new_hidden, old_hidden, **TOLERANCE)
+        old_tokens = old_logits[:, -1].argmax(dim = -1, keepdim = True)
+        new_tokens = new_logits[:, -1].argmax(dim = -1, keepdim = True)
+        assert torch.equal(new_tokens, old_tokens)
+
+@torch.no_grad()
+def test_forward_sequence_matches_reference(decoder, encoder_outputs, hidden):
+    input_ids = torch.randint(0, VOCAB_SIZE, (BATCH_SIZE, 12))
+    state, expected = hidden, []
+    for t in range(input_ids.size(1)):
+        logits, state = lstm_reference.decoder_step(decoder, input_ids[:, t:t + 1], state, encoder_outputs)
+        expected.append(logits)
+    logits, final = decoder.forward_sequence(input_ids, hidden, encoder_outputs)
+    torch.testing.assert_close(logits, torch.cat(expected, dim = 1), **TOLERANCE)
+    torch.testing.assert_close(final, state, **TOLERANCE)